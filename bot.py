@@ -33,17 +33,14 @@ class MysteryBoxBot(commands.Bot):
         # Ensure data directory exists
         ensure_data_directory()
         
-        # Store active giveaways and their tasks
-        self.active_giveaways = {}
+        # Initialize session storage
+        self._sessions = set()
         
     async def setup_hook(self):
         # Load cogs
         await self.load_extension("cogs.giveaway")
         logger.info("Giveaway cog loaded")
         
-        # Initialize session storage
-        self._sessions = set()
-        
         # Force command sync on startup
         os.environ["SYNC_COMMANDS"] = "true"
         
@@ -67,6 +64,14 @@ class MysteryBoxBot(commands.Bot):
         
     async def close(self):
         """Cleanup when bot is shutting down"""
+        # Write any buffered giveaway changes before anything else is torn down
+        giveaway_cog = self.get_cog("GiveawayCog")
+        if giveaway_cog:
+            try:
+                await giveaway_cog.flush_giveaways()
+            except Exception as e:
+                logger.error(f"Error flushing giveaways on close: {e}")
+        
         # Close all active sessions
         for session in self._sessions:
             try:
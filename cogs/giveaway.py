@@ -1,27 +1,37 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+import aiohttp
+import io
 from discord import app_commands
 import asyncio
 import json
 import os
-import random
 import logging
 from datetime import datetime, timedelta
+import time
 import traceback
 from utils.database import (
     load_giveaways,
-    save_giveaways,
+    GiveawayWriteBehind,
+    archive_giveaways_async,
+    load_archived_giveaway_async,
+    ARCHIVE_AFTER_HOURS,
     load_prizes,
-    save_prizes,
+    save_prizes_async,
     load_gifs,
-    save_gifs,
-    save_gif_file,
+    save_gifs_async,
+    save_gif_file_async,
     get_gif_path,
     load_prize_lists,
-    save_prize_lists,
-    save_prize_list_file,
-    load_prize_list_file,
+    save_prize_lists_async,
+    save_prize_list_stream_async,
+    load_parsed_prize_list_async,
+    save_prize_snapshot_async,
+    load_prize_snapshot_async,
+    migrate_inline_prizes,
+    delete_prize_list_file_async,
     parse_prize_ids,
+    PRIZE_IDS_MAX_EXPANSION,
     GIVEAWAYS_FILE,
     PRIZES_FILE,
     GIFS_FILE,
@@ -29,16 +39,83 @@ from utils.database import (
     PRIZE_LISTS_DIR,
     PRIZE_LISTS_FILE
 )
+from utils.participants import ParticipantRoster
+from utils.cache import TTLCache
+from utils.users import UserNameResolver
+from utils.paginator import Paginator, clip
+from utils.scheduler import DeadlineScheduler
+from utils.metrics import LatencyHistogram
+from utils.join_queue import JoinQueue
+from utils.live_updates import CoalescingUpdater
+from utils.draw import MAX_WINNERS, num_winners, new_seed, commit_seed, draw_giveaway, draw_snapshot_key, verify_draw
+from utils.prizes import (
+    PrizeIdIndex,
+    PrizeListReader,
+    PrizeListTooLarge,
+    PRIZE_LIST_MAX_BYTES,
+    PRIZE_LIST_MAX_ROWS,
+    format_prize_entry,
+    prize_snapshot
+)
+from utils.ratelimit import (
+    TokenBucketLimiter,
+    JOIN_CLICK_RATE,
+    JOIN_CLICK_BURST,
+    JOIN_CLICK_PER_GIVEAWAY,
+    JOIN_CLICK_MAX_TRACKED
+)
 
 logger = logging.getLogger(__name__)
 
-class GiveawayButton(discord.ui.View):
-    def __init__(self, giveaway_id, timeout=None):
-        super().__init__(timeout=timeout)
+# Winners listed in one announcement message of a multi-winner draw
+WINNERS_PER_MESSAGE = 25
+
+# How long (seconds) an admin permission check is reused for the same user on the same server
+ADMIN_CACHE_TTL = float(os.getenv("ADMIN_CACHE_TTL", "60"))
+ADMIN_CACHE_SIZE = 1024
+
+# Items per page of the list commands; larger rosters also come as a file
+PARTICIPANTS_PER_PAGE = 25
+PRIZES_PER_PAGE = 20
+LISTS_PER_PAGE = 10
+PARTICIPANTS_FILE_THRESHOLD = int(os.getenv("PARTICIPANTS_FILE_THRESHOLD", "500"))
+
+# Seconds until the end of a giveaway is retried when its prizes can't be loaded
+DRAW_RETRY_SECONDS = 300
+
+# Assigned prizes and missing prize IDs / ranges listed in the /assignprizes reply
+ASSIGNED_PRIZES_SHOWN = 15
+MISSING_PRIZE_SPANS_SHOWN = 20
+# Discord rejects messages longer than this
+MESSAGE_LIMIT = 2000
+
+# Size of the pieces an uploaded prize list is downloaded and parsed in
+PRIZE_LIST_CHUNK_SIZE = 64 * 1024
+
+class GiveawayJoinButton(discord.ui.DynamicItem[discord.ui.Button], template=r"giveaway:join:(?P<giveaway_id>[^:]+)"):
+    """Join button whose custom_id carries the giveaway ID
+    
+    The class is registered once with bot.add_dynamic_items(), so clicks on
+    any giveaway message are routed here, also after a restart, without a
+    View being kept in memory for every giveaway.
+    """
+    
+    def __init__(self, giveaway_id):
+        super().__init__(
+            discord.ui.Button(
+                label="Учавствовать",
+                style=discord.ButtonStyle.primary,
+                emoji="🎁",
+                custom_id=f"giveaway:join:{giveaway_id}"
+            )
+        )
         self.giveaway_id = giveaway_id
         
-    @discord.ui.button(label="Учавствовать", style=discord.ButtonStyle.primary, emoji="🎁")
-    async def participate_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["giveaway_id"])
+        
+    async def callback(self, interaction: discord.Interaction):
         # Get the cog instance
         giveaway_cog = interaction.client.get_cog("GiveawayCog")
         
@@ -47,18 +124,66 @@ class GiveawayButton(discord.ui.View):
         else:
             await interaction.response.send_message("Система розыгрышей не доступна в данный момент.", ephemeral=True)
 
+class GiveawayButton(discord.ui.View):
+    def __init__(self, giveaway_id):
+        super().__init__(timeout=None)
+        self.add_item(GiveawayJoinButton(giveaway_id))
+
+def build_giveaway_embed(giveaway_id, giveaway):
+    """Embed of an active giveaway message"""
+    embed = discord.Embed(
+        title=f"🎁 {giveaway['title']}",
+        description=f"{giveaway['description']}\n\n**Окончание:** <t:{int(giveaway['end_time'])}:R>",
+        color=discord.Color.blue()
+    )
+    if num_winners(giveaway) > 1:
+        embed.add_field(name="Победителей", value=str(num_winners(giveaway)), inline=True)
+    if giveaway.get("live_counter", False):
+        embed.add_field(name="Участников", value=str(len(giveaway["participants"])), inline=False)
+    footer = f"ID розыгрыша: {giveaway_id}"
+    if giveaway.get("seed_commitment"):
+        # Published before anyone joins, the seed itself is revealed with the results
+        footer += f"\nХэш сида: {giveaway['seed_commitment']}"
+    embed.set_footer(text=footer)
+    return embed
+
 class GiveawayCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.giveaways = load_giveaways()
+        # Giveaway changes are journaled right away and snapshotted in the background
+        self.giveaway_saver = GiveawayWriteBehind(self.giveaways)
+        # Recover changes that were journaled but not yet snapshotted before a crash
+        self.giveaway_saver.replay_journal()
+        # Prizes older versions copied into every giveaway are moved into shared snapshots
+        for giveaway_id in migrate_inline_prizes(self.giveaways):
+            self.giveaway_saver.mark_dirty(giveaway_id)
+        # One task ends every giveaway when its end_time comes
+        self.end_scheduler = DeadlineScheduler(self.end_giveaway)
+        # Time from a join click reaching the bot to its reply being sent
+        self.join_ack_latency = LatencyHistogram()
+        # Join clicks are acknowledged right away and applied in batches
+        self.join_queue = JoinQueue(self.apply_join_batch)
+        # Throttles repeated join clicks before they reach any giveaway state
+        self.join_limiter = TokenBucketLimiter(JOIN_CLICK_RATE, JOIN_CLICK_BURST, JOIN_CLICK_MAX_TRACKED)
+        # Participant counters on giveaway messages, edited at most once per window
+        self.live_counters = CoalescingUpdater(self.update_live_counter)
+        # Giveaways whose draw is waiting for prizes that could not be loaded (creator already notified)
+        self.postponed_draws = set()
         self.prizes = load_prizes()
+        # Numeric prize IDs in order, for /assignprizes ranges
+        self.prize_index = PrizeIdIndex(self.prizes)
         self.gifs = load_gifs()
         self.prize_lists = load_prize_lists()
+        # Participant names for /participants
+        self.user_names = UserNameResolver(bot)
+        # (guild ID, user ID) -> whether the user is an admin there; dropped on member and role changes
+        self.admin_cache = TTLCache(ADMIN_CACHE_SIZE, ADMIN_CACHE_TTL)
         # ID серверов, на которых разрешена работа бота
-        self.allowed_guild_ids = [
+        self.allowed_guild_ids = {
             714813888226525226,  # Основной сервер
             1093641722589876336   # Тестовый сервер
-        ]
+        }
         # Режим отладки - если True, проверка сервера отключена
         # В продакшене режим должен быть отключен (false)
         self.debug_mode = os.getenv("DEBUG_MODE", "false").lower() == "true"
@@ -70,6 +195,75 @@ class GiveawayCog(commands.Cog):
         
         self.reload_active_giveaways()
         
+    async def cog_load(self):
+        # Join buttons of every giveaway message, including ones posted before a restart;
+        # registered here so a reloaded extension registers its own class
+        self.bot.add_dynamic_items(GiveawayJoinButton)
+        self.giveaway_saver.start()
+        self.join_queue.start()
+        self.end_scheduler.start()
+        self.archive_ended_giveaways.start()
+        self.button_upgrade_task = asyncio.create_task(self.upgrade_legacy_buttons())
+        
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(GiveawayJoinButton)
+        self.archive_ended_giveaways.cancel()
+        self.button_upgrade_task.cancel()
+        await self.end_scheduler.close()
+        await self.live_counters.close()
+        await self.join_queue.close()
+        await self.giveaway_saver.close()
+        
+    async def flush_giveaways(self):
+        """Write all pending giveaway changes to disk immediately"""
+        await self.join_queue.flush()
+        await self.giveaway_saver.flush()
+        
+    async def get_giveaway(self, giveaway_id, include_archived=False):
+        """Find a giveaway in the live set, optionally falling back to the archive"""
+        giveaway = self.giveaways.get(giveaway_id)
+        if giveaway is None and include_archived:
+            giveaway = await load_archived_giveaway_async(giveaway_id)
+        return giveaway
+        
+    async def upgrade_legacy_buttons(self):
+        """Swap the join button on active giveaways posted before it became persistent
+        
+        The old buttons had random custom_ids that stop working after a restart.
+        """
+        await self.bot.wait_until_ready()
+        for giveaway_id, giveaway in list(self.giveaways.items()):
+            if giveaway.get("ended", False) or giveaway.get("persistent_button", False):
+                continue
+            try:
+                channel = self.bot.get_channel(int(giveaway.get("channel_id", 0)))
+                message_id = int(giveaway.get("message_id", 0))
+                if not channel or not message_id:
+                    continue
+                message = await channel.fetch_message(message_id)
+                await message.edit(view=GiveawayButton(giveaway_id))
+                giveaway["persistent_button"] = True
+                self.giveaway_saver.record(giveaway_id, "update", fields={"persistent_button": True})
+                logger.info(f"Upgraded join button of giveaway {giveaway_id}")
+            except discord.NotFound:
+                logger.warning(f"Message of giveaway {giveaway_id} not found, join button not upgraded")
+            except Exception as e:
+                logger.error(f"Error upgrading join button of giveaway {giveaway_id}: {e}")
+        
+    @tasks.loop(hours=1)
+    async def archive_ended_giveaways(self):
+        """Move giveaways that ended more than ARCHIVE_AFTER_HOURS ago out of the live set"""
+        try:
+            cutoff = datetime.now().timestamp() - ARCHIVE_AFTER_HOURS * 3600
+            archived = await archive_giveaways_async(self.giveaways, cutoff)
+            # The snapshot has to be rewritten without them
+            for giveaway_id in archived:
+                self.giveaway_saver.mark_dirty(giveaway_id)
+            if archived:
+                logger.info(f"Archived {len(archived)} ended giveaway(s)")
+        except Exception as e:
+            logger.error(f"Error archiving ended giveaways: {e}")
+        
     async def is_allowed_guild(self, interaction: discord.Interaction) -> bool:
         """Проверяет, разрешен ли сервер для использования бота"""
         # Если включен режим отладки, пропускаем проверку сервера
@@ -85,6 +279,79 @@ class GiveawayCog(commands.Cog):
             return False
         return True
         
+    async def has_admin_permissions(self, interaction, guild, debug_prefix):
+        """Check the user's roles and permissions on the server, without the cache"""
+        # Сохраняем подробный лог для отладки
+        logger.debug(f"{debug_prefix} Guild: {guild.name} (ID: {guild.id})")
+        logger.debug(f"{debug_prefix} Owner ID: {guild.owner_id}")
+        logger.debug(f"{debug_prefix} User ID: {interaction.user.id}")
+        
+        # Проверка на владельца сервера - всегда разрешать владельцу
+        if guild.owner_id == interaction.user.id:
+            logger.info(f"{debug_prefix} User is server owner, granting access")
+            return True
+        
+        # Получаем объект member для более детальной проверки прав
+        member = guild.get_member(interaction.user.id)
+        if member is None:
+            try:
+                logger.debug(f"{debug_prefix} Member not found via get_member, trying fetch_member")
+                member = await guild.fetch_member(interaction.user.id)
+            except Exception as e:
+                logger.error(f"{debug_prefix} Error fetching member: {e}")
+        
+        # Проверяем права администратора через объект member, если он доступен
+        if member:
+            # Проверка, есть ли роль с правами администратора
+            admin_role_names = [role.name for role in member.roles if role.permissions.administrator]
+            if admin_role_names:
+                logger.info(f"{debug_prefix} User has admin role(s): {', '.join(admin_role_names)}")
+                return True
+            
+            # Проверка через guild_permissions
+            if member.guild_permissions.administrator:
+                logger.info(f"{debug_prefix} User has administrator permission")
+                return True
+        
+        # Если не удалось проверить через member, используем guild_permissions из interaction
+        if interaction.user.guild_permissions.administrator:
+            logger.info(f"{debug_prefix} User has administrator permission via interaction check")
+            return True
+        
+        logger.warning(f"{debug_prefix} User does not have administrator permissions")
+        return False
+    
+    def forget_admin_decisions(self, guild_id, user_id=None):
+        """Drop cached admin decisions for a server, or for one user on it"""
+        if user_id is not None:
+            self.admin_cache.pop((guild_id, user_id))
+        else:
+            self.admin_cache.discard_if(lambda key: key[0] == guild_id)
+    
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.forget_admin_decisions(after.guild.id, after.id)
+    
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.forget_admin_decisions(member.guild.id, member.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.permissions != after.permissions:
+            self.forget_admin_decisions(after.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        # Members lose the role without a member update event
+        self.forget_admin_decisions(role.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        if before.owner_id != after.owner_id:
+            self.forget_admin_decisions(after.id)
+    
     async def is_admin(self, interaction: discord.Interaction) -> bool:
         """Проверяет, имеет ли пользователь права администратора"""
         debug_prefix = "[DEBUG]" if self.debug_mode else "[PROD]"
@@ -101,54 +368,19 @@ class GiveawayCog(commands.Cog):
             return True
         
         try:
-            # Сохраняем подробный лог для отладки
             guild = interaction.guild
             if guild:
-                logger.debug(f"{debug_prefix} Guild: {guild.name} (ID: {guild.id})")
-                logger.debug(f"{debug_prefix} Owner ID: {guild.owner_id}")
-                logger.debug(f"{debug_prefix} User ID: {interaction.user.id}")
-                
-                # Проверка на владельца сервера - всегда разрешать владельцу
-                if guild.owner_id == interaction.user.id:
-                    logger.info(f"{debug_prefix} User is server owner, granting access")
-                    return True
-                
-                # Получаем объект member для более детальной проверки прав
-                member = guild.get_member(interaction.user.id)
-                if member is None:
-                    try:
-                        logger.debug(f"{debug_prefix} Member not found via get_member, trying fetch_member")
-                        member = await guild.fetch_member(interaction.user.id)
-                    except Exception as e:
-                        logger.error(f"{debug_prefix} Error fetching member: {e}")
-                
-                # Проверяем права администратора через объект member, если он доступен
-                if member:
-                    # Проверка, есть ли роль с правами администратора
-                    has_admin_role = False
-                    admin_role_names = []
-                    
-                    for role in member.roles:
-                        if role.permissions.administrator:
-                            has_admin_role = True
-                            admin_role_names.append(role.name)
-                    
-                    if has_admin_role:
-                        logger.info(f"{debug_prefix} User has admin role(s): {', '.join(admin_role_names)}")
-                        return True
-                    
-                    # Проверка через guild_permissions
-                    if member.guild_permissions.administrator:
-                        logger.info(f"{debug_prefix} User has administrator permission")
-                        return True
-                
-                # Если не удалось проверить через member, используем guild_permissions из interaction
-                if interaction.user.guild_permissions.administrator:
-                    logger.info(f"{debug_prefix} User has administrator permission via interaction check")
+                key = (guild.id, interaction.user.id)
+                allowed = self.admin_cache.get(key)
+                if allowed is None:
+                    allowed = await self.has_admin_permissions(interaction, guild, debug_prefix)
+                    self.admin_cache.put(key, allowed)
+                else:
+                    logger.debug(f"{debug_prefix} Cached admin decision for user {interaction.user.id}: {allowed}")
+                if allowed:
                     return True
                 
                 # Если дошли сюда - пользователь не имеет прав администратора
-                logger.warning(f"{debug_prefix} User does not have administrator permissions")
                 await interaction.response.send_message(
                     "У вас нет прав администратора для использования этой команды. "
                     "Необходимы права администратора или соответствующая роль.",
@@ -181,7 +413,7 @@ class GiveawayCog(commands.Cog):
             return False
         
     def reload_active_giveaways(self):
-        """Restart timers for any active giveaways when bot starts/restarts"""
+        """Schedule the end of every active giveaway when bot starts/restarts"""
         now = datetime.now().timestamp()
         
         for giveaway_id, giveaway in list(self.giveaways.items()):
@@ -189,46 +421,53 @@ class GiveawayCog(commands.Cog):
                 continue
                 
             end_time = giveaway.get("end_time", 0)
+            # Giveaways that should have ended already fire as soon as the scheduler starts
+            self.end_scheduler.schedule(giveaway_id, end_time)
             
             if end_time > now:
-                # Recreate the task for this giveaway
-                seconds_left = end_time - now
-                self.bot.active_giveaways[giveaway_id] = asyncio.create_task(
-                    self.schedule_giveaway_end(giveaway_id, seconds_left)
-                )
-                logger.info(f"Restored giveaway {giveaway_id} with {seconds_left:.2f} seconds left")
+                logger.info(f"Restored giveaway {giveaway_id} with {end_time - now:.2f} seconds left")
             else:
-                # This giveaway should have ended already
-                asyncio.create_task(self.end_giveaway(giveaway_id))
                 logger.info(f"Ending missed giveaway {giveaway_id}")
     
-    async def schedule_giveaway_end(self, giveaway_id, seconds):
-        """Schedule the end of a giveaway after the specified time"""
-        try:
-            await asyncio.sleep(seconds)
-            await self.end_giveaway(giveaway_id)
-        except asyncio.CancelledError:
-            logger.info(f"Giveaway task for {giveaway_id} was cancelled")
-        except Exception as e:
-            logger.error(f"Error in giveaway task: {e}")
-            logger.error(traceback.format_exc())
-    
     async def end_giveaway(self, giveaway_id):
-        """End a giveaway and select a winner"""
+        """End a giveaway and select a winner, returns False if the draw had to be postponed"""
         try:
             if giveaway_id not in self.giveaways:
                 logger.error(f"Giveaway {giveaway_id} not found when trying to end it")
                 return
                 
             giveaway = self.giveaways[giveaway_id]
+            # Ended early or by the scheduler, either way it must not fire again
+            self.end_scheduler.cancel(giveaway_id)
+            if giveaway.get("ended", False):
+                return
+            
+            # Prizes are loaded before the giveaway is closed
+            snapshot_key, snapshot = await self.load_draw_prizes(giveaway)
+            
+            # Everyone who was told they joined has to be in the draw
+            await self.join_queue.drain(giveaway_id)
+            if giveaway.get("ended", False):
+                return
+            if snapshot is None and giveaway.get("participants"):
+                # Drawing without the assigned prizes can't be undone, so the giveaway stays open
+                await self.postpone_end(giveaway_id, giveaway)
+                return False
+            self.postponed_draws.discard(giveaway_id)
+            # A late counter update must not overwrite the result
+            self.live_counters.discard(giveaway_id)
             
             # Mark as ended
             giveaway["ended"] = True
-            save_giveaways(self.giveaways)
+            giveaway["ended_at"] = datetime.now().timestamp()
+            giveaway["participants"].release_index()
+            self.giveaway_saver.record(giveaway_id, "end", ended_at=giveaway["ended_at"])
+            
+            # Draw before touching Discord so the result is stored even if the message is gone
+            results = self.draw_winners(giveaway_id, giveaway, snapshot_key, snapshot)
             
             channel_id = giveaway.get("channel_id")
             message_id = giveaway.get("message_id")
-            participants = giveaway.get("participants", [])
             
             if not channel_id or not message_id:
                 logger.error(f"Missing channel_id or message_id for giveaway {giveaway_id}")
@@ -245,59 +484,15 @@ class GiveawayCog(commands.Cog):
                 logger.error(f"Could not find message {message_id} in channel {channel_id}")
                 message = None
             
-            # Select winner if there are participants
-            if participants:
-                winner_id = random.choice(participants)
-                
-                # Select a random prize
-                prize = "Mystery Prize"  # Default if no prizes available
-                
-                # Check if the giveaway has assigned prizes
-                if giveaway.get("assigned_prizes"):
-                    prize = random.choice(list(giveaway["assigned_prizes"].values()))
-                # Otherwise use the global prize pool
-                elif self.prizes:
-                    prize = random.choice(list(self.prizes.values()))
-                
-                winner_mention = f"<@{winner_id}>"
-                
-                # Send the winner announcement
-                embed = discord.Embed(
-                    title="🎉 Розыгрыш завершен! 🎉",
-                    description=f"**Победитель: {winner_mention}**\n**Приз: {prize}**",
-                    color=discord.Color.green()
-                )
-                embed.set_footer(text=f"Розыгрыш ID: {giveaway_id}")
-                
-                # Check if there's a celebration GIF attached to this giveaway
-                gif_id = giveaway.get("celebration_gif")
-                if gif_id and gif_id in self.gifs:
-                    gif_path = get_gif_path(gif_id)
-                    if gif_path and os.path.exists(gif_path):
-                        file = discord.File(gif_path, filename="celebration.gif")
-                        embed.set_image(url="attachment://celebration.gif")
-                        await channel.send(
-                            content=f"Поздравляем {winner_mention}! Вы выиграли **{prize}**!",
-                            embed=embed,
-                            file=file
-                        )
-                    else:
-                        await channel.send(
-                            content=f"Поздравляем {winner_mention}! Вы выиграли **{prize}**!",
-                            embed=embed
-                        )
-                else:
-                    await channel.send(
-                        content=f"Поздравляем {winner_mention}! Вы выиграли **{prize}**!",
-                        embed=embed
-                    )
+            if results:
+                await self.announce_winners(channel, giveaway_id, giveaway, results)
                 
                 # Update the original message if it exists
                 if message:
                     original_embed = message.embeds[0] if message.embeds else None
                     if original_embed:
                         original_embed.title = "🎁 Розыгрыш завершен!"
-                        original_embed.description += f"\n\n**Победитель: {winner_mention}**\n**Приз: {prize}**"
+                        original_embed.description += "\n\n" + self.format_results_summary(results, 4096 - len(original_embed.description) - 2)
                         original_embed.color = discord.Color.dark_grey()
                         
                         await message.edit(embed=original_embed, view=None)
@@ -322,20 +517,137 @@ class GiveawayCog(commands.Cog):
                         
                         await message.edit(embed=original_embed, view=None)
             
-            # Clean up
-            if giveaway_id in self.bot.active_giveaways:
-                del self.bot.active_giveaways[giveaway_id]
-                
         except Exception as e:
             logger.error(f"Error ending giveaway {giveaway_id}: {e}")
             logger.error(traceback.format_exc())
     
+    async def load_draw_prizes(self, giveaway):
+        """Prize snapshot a giveaway will be drawn from, as (key, snapshot)
+        
+        Assigned prizes (weighted, limited ones run out) come from the
+        giveaway's snapshot, and snapshot is None if it can't be loaded.
+        Otherwise it is a snapshot of the global prize list as it is now.
+        """
+        snapshot_key = giveaway.get("prize_snapshot")
+        if snapshot_key:
+            return snapshot_key, await load_prize_snapshot_async(snapshot_key)
+        snapshot = prize_snapshot(self.prizes)
+        return await save_prize_snapshot_async(snapshot), snapshot
+    
+    async def postpone_end(self, giveaway_id, giveaway):
+        """Try ending a giveaway again later because its prizes can't be loaded, telling its creator once"""
+        logger.error(
+            f"Prize snapshot {giveaway.get('prize_snapshot')} of giveaway {giveaway_id} could not be loaded, "
+            f"draw postponed by {DRAW_RETRY_SECONDS:.0f} seconds"
+        )
+        self.end_scheduler.schedule(giveaway_id, datetime.now().timestamp() + DRAW_RETRY_SECONDS)
+        if giveaway_id in self.postponed_draws:
+            return
+        self.postponed_draws.add(giveaway_id)
+        try:
+            creator = await self.bot.fetch_user(int(giveaway["creator_id"]))
+            await creator.send(
+                f"⚠️ Не удалось загрузить призы розыгрыша **{giveaway['title']}** (ID: `{giveaway_id}`), "
+                f"поэтому победители не выбраны. Бот будет повторять попытку каждые {DRAW_RETRY_SECONDS / 60:.0f} мин. "
+                "Назначьте призы заново командой /assignprizes или /assignprizelist."
+            )
+        except Exception as e:
+            logger.error(f"Could not notify the creator of giveaway {giveaway_id}: {e}")
+    
+    def draw_winners(self, giveaway_id, giveaway, snapshot_key, snapshot):
+        """Draw the winners of a giveaway and store the results with everything needed to verify them"""
+        if not giveaway.get("participants"):
+            return []
+        if not giveaway.get("draw_seed"):
+            # Giveaways created before draws were seeded have no published commitment
+            giveaway["draw_seed"] = new_seed()
+        
+        results, draw = draw_giveaway(giveaway_id, giveaway, snapshot_key, snapshot)
+        if snapshot_key is None:
+            # The snapshot of the global list could not be stored, keep a copy so the draw can still be verified
+            draw["prizes"] = {prize_id: name for prize_id, name, _, _ in snapshot["entries"]}
+        giveaway["winners"] = results
+        giveaway["draw"] = draw
+        self.giveaway_saver.record(giveaway_id, "update", fields={"winners": results, "draw": draw})
+        return results
+    
+    def format_results_summary(self, results, limit):
+        """Winners and prizes for the original giveaway message, cut to fit limit characters"""
+        if len(results) == 1:
+            return f"**Победитель: <@{results[0]['user']}>**\n**Приз: {results[0]['prize']}**"
+        lines = [f"**Победители ({len(results)}):**"]
+        length = len(lines[0])
+        for shown, result in enumerate(results):
+            line = f"{shown + 1}. <@{result['user']}> — {result['prize']}"
+            # Leave room for the "and N more" line
+            if length + len(line) + 40 > limit:
+                lines.append(f"...и еще {len(results) - shown}")
+                break
+            lines.append(line)
+            length += len(line) + 1
+        return "\n".join(lines)
+    
+    async def announce_winners(self, channel, giveaway_id, giveaway, results):
+        """Post the results, split into several messages for large draws"""
+        if len(results) == 1:
+            winner_mention = f"<@{results[0]['user']}>"
+            prize = results[0]["prize"]
+            chunks = [(
+                f"Поздравляем {winner_mention}! Вы выиграли **{prize}**!",
+                f"**Победитель: {winner_mention}**\n**Приз: {prize}**"
+            )]
+        else:
+            # Up to WINNERS_PER_MESSAGE winners per message, fewer if long prize names would overflow the embed
+            groups = [[]]
+            length = 0
+            for number, result in enumerate(results, 1):
+                line = f"{number}. <@{result['user']}> — **{result['prize']}**"
+                if groups[-1] and (len(groups[-1]) == WINNERS_PER_MESSAGE or length + len(line) + 1 > 4000):
+                    groups.append([])
+                    length = 0
+                groups[-1].append((result, line))
+                length += len(line) + 1
+            chunks = [
+                (
+                    "Поздравляем " + ", ".join(f"<@{result['user']}>" for result, _ in group) + "!",
+                    "\n".join(line[:4000] for _, line in group)
+                )
+                for group in groups
+            ]
+        
+        # Check if there's a celebration GIF attached to this giveaway
+        gif_path = None
+        gif_id = giveaway.get("celebration_gif")
+        if gif_id and gif_id in self.gifs:
+            gif_path = get_gif_path(gif_id)
+            if gif_path and not os.path.exists(gif_path):
+                gif_path = None
+        
+        for number, (content, description) in enumerate(chunks):
+            # Send the winner announcement
+            embed = discord.Embed(
+                title="🎉 Розыгрыш завершен! 🎉" if number == 0 else "🎉 Победители (продолжение)",
+                description=description,
+                color=discord.Color.green()
+            )
+            embed.set_footer(text=f"Розыгрыш ID: {giveaway_id}\nСид: {giveaway['draw']['seed']} (/verifydraw)")
+            
+            # The celebration GIF goes with the first message only
+            if number == 0 and gif_path:
+                file = discord.File(gif_path, filename="celebration.gif")
+                embed.set_image(url="attachment://celebration.gif")
+                await channel.send(content=content, embed=embed, file=file)
+            else:
+                await channel.send(content=content, embed=embed)
+    
     @app_commands.command(name="mysterybox", description="Создать новый розыгрыш")
     @app_commands.describe(
         hours="Продолжительность розыгрыша в часах",
         minutes="Продолжительность розыгрыша в минутах (добавляется к часам)",
         title="Название розыгрыша",
-        description="Описание розыгрыша"
+        description="Описание розыгрыша",
+        live_counter="Показывать количество участников в сообщении розыгрыша",
+        winners=f"Количество победителей (от 1 до {MAX_WINNERS})"
     )
     @app_commands.default_permissions(administrator=True)
     async def create_giveaway(
@@ -344,11 +656,20 @@ class GiveawayCog(commands.Cog):
         hours: int = 24, 
         minutes: int = 0,
         title: str = "Таинственный розыгрыш",
-        description: str = "Нажмите на кнопку ниже, чтобы принять участие в розыгрыше!"
+        description: str = "Нажмите на кнопку ниже, чтобы принять участие в розыгрыше!",
+        live_counter: bool = False,
+        winners: int = 1
     ):
         # Проверяем разрешения и права администратора
         if not await self.is_admin(interaction):
             return
+        
+        if not 1 <= winners <= MAX_WINNERS:
+            await interaction.response.send_message(
+                f"Количество победителей должно быть от 1 до {MAX_WINNERS}.",
+                ephemeral=True
+            )
+            return
             
         # Generate unique ID for the giveaway
         giveaway_id = f"{interaction.guild.id}-{datetime.now().timestamp()}"
@@ -358,13 +679,23 @@ class GiveawayCog(commands.Cog):
         end_time = datetime.now() + duration
         end_timestamp = end_time.timestamp()
         
-        # Create embed
-        embed = discord.Embed(
-            title=f"🎁 {title}",
-            description=f"{description}\n\n**Окончание:** <t:{int(end_timestamp)}:R>",
-            color=discord.Color.blue()
-        )
-        embed.set_footer(text=f"ID розыгрыша: {giveaway_id}")
+        channel = interaction.channel
+        giveaway = {
+            "title": title,
+            "description": description,
+            "creator_id": str(interaction.user.id),
+            "channel_id": str(channel.id),
+            "guild_id": str(interaction.guild.id),
+            "end_time": end_timestamp,
+            "participants": ParticipantRoster(),
+            "ended": False,
+            "persistent_button": True,
+            "live_counter": live_counter,
+            "num_winners": winners
+        }
+        # The draw is determined by this seed; only its hash is shown until the giveaway ends
+        giveaway["draw_seed"] = new_seed()
+        giveaway["seed_commitment"] = commit_seed(giveaway["draw_seed"])
         
         # Create the view with the button
         view = GiveawayButton(giveaway_id)
@@ -373,125 +704,209 @@ class GiveawayCog(commands.Cog):
         await interaction.response.send_message("Розыгрыш создан!", ephemeral=True)
         
         # Send the giveaway message
-        channel = interaction.channel
-        giveaway_message = await channel.send(embed=embed, view=view)
+        giveaway_message = await channel.send(embed=build_giveaway_embed(giveaway_id, giveaway), view=view)
         
         # Save giveaway data
-        self.giveaways[giveaway_id] = {
-            "title": title,
-            "description": description,
-            "creator_id": str(interaction.user.id),
-            "channel_id": str(channel.id),
-            "message_id": str(giveaway_message.id),
-            "guild_id": str(interaction.guild.id),
-            "end_time": end_timestamp,
-            "participants": [],
-            "ended": False
-        }
-        save_giveaways(self.giveaways)
+        giveaway["message_id"] = str(giveaway_message.id)
+        self.giveaways[giveaway_id] = giveaway
+        self.giveaway_saver.record(giveaway_id, "create", giveaway=giveaway)
         
         # Schedule the giveaway end
-        seconds_until_end = duration.total_seconds()
-        self.bot.active_giveaways[giveaway_id] = asyncio.create_task(
-            self.schedule_giveaway_end(giveaway_id, seconds_until_end)
-        )
+        self.end_scheduler.schedule(giveaway_id, end_timestamp)
         
-        logger.info(f"Created giveaway {giveaway_id} ending in {seconds_until_end} seconds")
+        logger.info(f"Created giveaway {giveaway_id} ending in {duration.total_seconds()} seconds")
     
     async def add_participant(self, interaction: discord.Interaction, giveaway_id: str):
-        """Add a participant to a giveaway"""
-        # В режиме отладки выводим информацию
-        if self.debug_mode:
-            print(f"Debug: Adding participant to giveaway {giveaway_id}")
-            print(f"Debug: User: {interaction.user.name} (ID: {interaction.user.id})")
-            print(f"Debug: Guild: {interaction.guild.name} (ID: {interaction.guild.id})")
-            
+        """Add a participant to a giveaway
+        
+        Everything up to the reply works on in-memory state only, so the
+        interaction is acknowledged well within Discord's 3 second limit;
+        the join itself is queued and applied by the join queue in a batch.
+        """
+        started = time.perf_counter()
+        
+        limiter_key = (interaction.user.id, giveaway_id) if JOIN_CLICK_PER_GIVEAWAY else interaction.user.id
+        if not self.join_limiter.allow(limiter_key):
+            await interaction.response.send_message("Вы нажимаете кнопку слишком часто. Подождите немного.", ephemeral=True)
+            return
+        
         # В режиме отладки пропускаем проверку сервера
-        if not self.debug_mode:
-            # Проверяем, что это разрешенный сервер
-            if not await self.is_allowed_guild(interaction):
-                print(f"Debug: Server not allowed, participation blocked")
-                return
-        else:
-            print(f"Debug: Skipping server check in debug mode")
+        if not await self.is_allowed_guild(interaction):
+            logger.debug(f"Join blocked, guild {interaction.guild_id} is not allowed")
+            return
             
-        if giveaway_id not in self.giveaways:
-            print(f"Debug: Giveaway {giveaway_id} not found")
+        giveaway = self.giveaways.get(giveaway_id)
+        if giveaway is None:
             await interaction.response.send_message("Этот розыгрыш больше не активен.", ephemeral=True)
             return
-            
-        giveaway = self.giveaways[giveaway_id]
-        print(f"Debug: Giveaway info: {giveaway['title']}, ended: {giveaway.get('ended', False)}")
         
         if giveaway.get("ended", False):
-            print(f"Debug: Giveaway already ended")
             await interaction.response.send_message("Этот розыгрыш уже завершен.", ephemeral=True)
             return
             
-        user_id = str(interaction.user.id)
-        participants = giveaway.get("participants", [])
-        print(f"Debug: Current participants: {len(participants)}")
+        user_id = interaction.user.id
         
-        if user_id in participants:
-            print(f"Debug: User already participating")
+        # Constant-time duplicate checks against the roster's set index and the queued joins
+        if user_id in giveaway["participants"] or self.join_queue.is_pending(giveaway_id, user_id):
             await interaction.response.send_message("Вы уже участвуете в этом розыгрыше!", ephemeral=True)
             return
-            
-        # Add user to participants
-        participants.append(user_id)
-        giveaway["participants"] = participants
-        save_giveaways(self.giveaways)
-        print(f"Debug: User added to participants, new count: {len(participants)}")
         
+        if not self.join_queue.submit(giveaway_id, user_id):
+            await interaction.response.send_message(
+                "Сейчас слишком много желающих участвовать. Пожалуйста, нажмите кнопку еще раз через несколько секунд.",
+                ephemeral=True
+            )
+            logger.warning(f"Join queue is full, turned away user {user_id} from giveaway {giveaway_id}")
+            return
+            
         await interaction.response.send_message("Вы успешно присоединились к розыгрышу! Ожидайте результатов.", ephemeral=True)
-        logger.info(f"User {user_id} joined giveaway {giveaway_id}")
+        self.join_ack_latency.record(time.perf_counter() - started)
+        
+    def apply_join_batch(self, giveaway_id, user_ids):
+        """Add a batch of queued join requests to a giveaway and journal them together"""
+        giveaway = self.giveaways.get(giveaway_id)
+        if giveaway is None or giveaway.get("ended", False):
+            logger.warning(f"Dropped {len(user_ids)} join(s) for giveaway {giveaway_id}, it is no longer active")
+            return
+        participants = giveaway["participants"]
+        joined = [user_id for user_id in user_ids if participants.add(user_id)]
+        self.giveaway_saver.record_many(giveaway_id, "join", [{"user": str(user_id)} for user_id in joined])
+        if joined and giveaway.get("live_counter", False):
+            self.live_counters.request(giveaway_id)
+        logger.debug(f"{len(joined)} user(s) joined giveaway {giveaway_id}, {len(participants)} participant(s)")
     
-    @app_commands.command(name="participants", description="Посмотреть список участников розыгрыша")
-    @app_commands.describe(giveaway_id="ID розыгрыша (можно найти в нижней части сообщения с розыгрышем)")
+    async def update_live_counter(self, giveaway_id):
+        """Show the current number of participants on the giveaway message"""
+        giveaway = self.giveaways.get(giveaway_id)
+        if giveaway is None or giveaway.get("ended", False):
+            return
+        channel = self.bot.get_channel(int(giveaway.get("channel_id", 0)))
+        message_id = int(giveaway.get("message_id", 0))
+        if not channel or not message_id:
+            return
+        # Partial message: no fetch needed, the join button stays as it is
+        await channel.get_partial_message(message_id).edit(embed=build_giveaway_embed(giveaway_id, giveaway))
+    
+    @app_commands.command(name="verifydraw", description="Проверить результаты завершенного розыгрыша")
+    @app_commands.describe(giveaway_id="ID розыгрыша")
     @app_commands.default_permissions(administrator=True)
-    async def view_participants(self, interaction: discord.Interaction, giveaway_id: str):
+    async def verify_draw_command(self, interaction: discord.Interaction, giveaway_id: str):
         # Проверяем разрешения и права администратора
         if not await self.is_admin(interaction):
             return
             
-        if giveaway_id not in self.giveaways:
+        giveaway = await self.get_giveaway(giveaway_id, include_archived=True)
+        if giveaway is None:
             await interaction.response.send_message("Розыгрыш с указанным ID не найден.", ephemeral=True)
             return
-            
-        giveaway = self.giveaways[giveaway_id]
-        participants = giveaway.get("participants", [])
         
-        if not participants:
-            await interaction.response.send_message("В этом розыгрыше пока нет участников.", ephemeral=True)
+        if not giveaway.get("ended", False):
+            await interaction.response.send_message("Розыгрыш еще не завершен.", ephemeral=True)
+            return
+        
+        if not giveaway.get("draw"):
+            await interaction.response.send_message("Для этого розыгрыша нет данных жеребьевки (не было участников или он был отменен).", ephemeral=True)
             return
-            
-        # Fetch user names
-        participant_list = []
-        for user_id in participants:
-            try:
-                user = await self.bot.fetch_user(int(user_id))
-                participant_list.append(f"{user.name} ({user.mention})")
-            except:
-                participant_list.append(f"Пользователь с ID {user_id}")
         
-        # Create paginated embeds if needed
+        snapshot_key = draw_snapshot_key(giveaway)
+        snapshot = await load_prize_snapshot_async(snapshot_key) if snapshot_key else None
+        checks = verify_draw(giveaway_id, giveaway, snapshot)
+        passed = all(ok for _, ok in checks)
+        draw = giveaway["draw"]
+        embed = discord.Embed(
+            title="✅ Результаты подтверждены" if passed else "❌ Результаты не подтверждены",
+            description="\n".join(f"{'✅' if ok else '❌'} {name}" for name, ok in checks),
+            color=discord.Color.green() if passed else discord.Color.red()
+        )
+        embed.add_field(name="Сид", value=f"`{draw['seed']}`", inline=False)
+        if giveaway.get("seed_commitment"):
+            embed.add_field(name="Хэш сида", value=f"`{giveaway['seed_commitment']}`", inline=False)
+        embed.add_field(name="Хэш списка участников", value=f"`{draw['roster_hash']}`", inline=False)
+        embed.add_field(name="Участников", value=str(draw["participants"]), inline=True)
+        embed.add_field(name="Победителей", value=str(len(giveaway.get("winners", []))), inline=True)
+        embed.set_footer(text=f"ID розыгрыша: {giveaway_id}")
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="joinstats", description="Время ответа на кнопку участия в розыгрыше")
+    @app_commands.default_permissions(administrator=True)
+    async def join_stats(self, interaction: discord.Interaction):
+        # Проверяем разрешения и права администратора
+        if not await self.is_admin(interaction):
+            return
+            
+        latency = self.join_ack_latency
+        if not latency.count:
+            await interaction.response.send_message("С момента запуска бота никто не нажимал кнопку участия.", ephemeral=True)
+            return
+            
         embed = discord.Embed(
-            title=f"Участники розыгрыша",
-            description=f"**Название:** {giveaway['title']}\n**Всего участников:** {len(participants)}",
+            title="Время ответа на кнопку участия",
+            description=f"Ответов с момента запуска: {latency.count}",
             color=discord.Color.blue()
         )
+        for name, value in (
+            ("p50", latency.percentile(50)),
+            ("p90", latency.percentile(90)),
+            ("p99", latency.percentile(99)),
+            ("Максимум", latency.max)
+        ):
+            embed.add_field(name=name, value=f"{value * 1000:.1f} мс", inline=True)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="participants", description="Посмотреть список участников розыгрыша")
+    @app_commands.describe(giveaway_id="ID розыгрыша (можно найти в нижней части сообщения с розыгрышем)")
+    @app_commands.default_permissions(administrator=True)
+    async def view_participants(self, interaction: discord.Interaction, giveaway_id: str):
+        # Проверяем разрешения и права администратора
+        if not await self.is_admin(interaction):
+            return
+            
+        # Looking up names can take a while, so acknowledge the command first
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        
+        # Ended giveaways may already have been moved to the archive
+        giveaway = await self.get_giveaway(giveaway_id, include_archived=True)
+        if giveaway is None:
+            await interaction.followup.send("Розыгрыш с указанным ID не найден.", ephemeral=True)
+            return
+            
+        # Frozen copy of the roster, so pages and the total don't shift while someone is paging
+        participants = giveaway.get("participants", [])[:]
         
-        # Add participants list (limited to 25 per embed to avoid hitting the character limit)
-        for i in range(0, len(participant_list), 25):
-            chunk = participant_list[i:i+25]
-            embed.add_field(
-                name=f"Участники {i+1}-{i+len(chunk)}",
-                value="\n".join(chunk),
-                inline=False
+        if not participants:
+            await interaction.followup.send("В этом розыгрыше пока нет участников.", ephemeral=True)
+            return
+        
+        async def render_page(user_ids, start):
+            # Names are resolved for one page at a time, as it is shown
+            names = await self.user_names.resolve(interaction.guild, user_ids)
+            lines = [
+                f"{start + n + 1}. {clip(names[user_id], 100)} (<@{user_id}>)" if names[user_id]
+                else f"{start + n + 1}. Пользователь с ID {user_id}"
+                for n, user_id in enumerate(user_ids)
+            ]
+            embed = discord.Embed(
+                title="Участники розыгрыша",
+                description=f"**Название:** {clip(giveaway['title'], 256)}\n**Всего участников:** {len(participants)}\n\n" + "\n".join(lines),
+                color=discord.Color.blue()
             )
+            embed.set_footer(text=f"ID розыгрыша: {giveaway_id}")
+            return embed
         
-        embed.set_footer(text=f"ID розыгрыша: {giveaway_id}")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        kwargs = {}
+        if len(participants) > PARTICIPANTS_FILE_THRESHOLD:
+            kwargs["file"] = self.participants_file(interaction.guild, giveaway_id, participants)
+        await Paginator(participants, render_page, PARTICIPANTS_PER_PAGE).send(interaction, **kwargs)
+    
+    def participants_file(self, guild, giveaway_id, participants):
+        """Full roster as a text file, with the names that are known without fetching them"""
+        buffer = io.StringIO()
+        for n, user_id in enumerate(participants, 1):
+            name = self.user_names.cached_name(guild, user_id)
+            buffer.write(f"{n}\t{user_id}\t{name or ''}\n")
+        return discord.File(io.BytesIO(buffer.getvalue().encode('utf-8')), filename=f"participants_{giveaway_id}.txt")
     
     @app_commands.command(name="addprize", description="Добавить приз в список возможных призов")
     @app_commands.describe(
@@ -510,7 +925,8 @@ class GiveawayCog(commands.Cog):
             
         # Add the prize
         self.prizes[prize_id] = prize_name
-        save_prizes(self.prizes)
+        self.prize_index.add(prize_id)
+        await save_prizes_async(self.prizes)
         
         await interaction.response.send_message(f"Приз **{prize_name}** успешно добавлен в список призов.", ephemeral=True)
         logger.info(f"Added prize {prize_id}: {prize_name}")
@@ -529,7 +945,8 @@ class GiveawayCog(commands.Cog):
             
         # Remove the prize
         prize_name = self.prizes.pop(prize_id)
-        save_prizes(self.prizes)
+        self.prize_index.discard(prize_id)
+        await save_prizes_async(self.prizes)
         
         await interaction.response.send_message(f"Приз **{prize_name}** успешно удален из списка призов.", ephemeral=True)
         logger.info(f"Removed prize {prize_id}: {prize_name}")
@@ -545,21 +962,19 @@ class GiveawayCog(commands.Cog):
             await interaction.response.send_message("Список призов пуст.", ephemeral=True)
             return
             
-        # Create an embed with the list of prizes
-        embed = discord.Embed(
-            title="Список призов",
-            description="Все возможные призы для розыгрышей:",
-            color=discord.Color.gold()
-        )
-        
-        for prize_id, prize_name in self.prizes.items():
-            embed.add_field(
-                name=prize_id,
-                value=prize_name,
-                inline=True
+        def render_page(prize_ids, start):
+            # Prizes removed since the command ran are skipped
+            lines = [
+                f"`{clip(prize_id, 50)}`: {clip(self.prizes[prize_id], 150)}"
+                for prize_id in prize_ids if prize_id in self.prizes
+            ]
+            return discord.Embed(
+                title="Список призов",
+                description="Все возможные призы для розыгрышей:\n\n" + "\n".join(lines),
+                color=discord.Color.gold()
             )
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await Paginator(list(self.prizes), render_page, PRIZES_PER_PAGE).send(interaction)
     
     @app_commands.command(name="endgiveaway", description="Досрочно завершить розыгрыш и выбрать победителя")
     @app_commands.describe(giveaway_id="ID розыгрыша для завершения")
@@ -579,14 +994,19 @@ class GiveawayCog(commands.Cog):
             await interaction.response.send_message("Этот розыгрыш уже завершен.", ephemeral=True)
             return
         
-        # Cancel the scheduled task
-        if giveaway_id in self.bot.active_giveaways:
-            self.bot.active_giveaways[giveaway_id].cancel()
+        # Cancel the scheduled end
+        self.end_scheduler.cancel(giveaway_id)
         
         await interaction.response.send_message("Розыгрыш завершается досрочно...", ephemeral=True)
         
         # End the giveaway and select a winner
-        await self.end_giveaway(giveaway_id)
+        if await self.end_giveaway(giveaway_id) is False:
+            await interaction.followup.send(
+                "Не удалось загрузить призы этого розыгрыша, поэтому он не завершен. "
+                f"Бот повторит попытку через {DRAW_RETRY_SECONDS / 60:.0f} мин.; "
+                "чтобы исправить это сразу, назначьте призы заново командой /assignprizes или /assignprizelist.",
+                ephemeral=True
+            )
         
     @app_commands.command(name="cancelgiveaway", description="Отменить активный розыгрыш")
     @app_commands.describe(giveaway_id="ID розыгрыша для отмены")
@@ -606,14 +1026,15 @@ class GiveawayCog(commands.Cog):
             await interaction.response.send_message("Этот розыгрыш уже завершен.", ephemeral=True)
             return
             
-        # Cancel the scheduled task if it exists
-        if giveaway_id in self.bot.active_giveaways:
-            self.bot.active_giveaways[giveaway_id].cancel()
-            del self.bot.active_giveaways[giveaway_id]
+        # Cancel the scheduled end
+        self.end_scheduler.cancel(giveaway_id)
+        self.live_counters.discard(giveaway_id)
         
         # Mark as ended
         giveaway["ended"] = True
-        save_giveaways(self.giveaways)
+        giveaway["ended_at"] = datetime.now().timestamp()
+        giveaway["participants"].release_index()
+        self.giveaway_saver.record(giveaway_id, "cancel", ended_at=giveaway["ended_at"])
         
         # Try to update the message
         try:
@@ -670,20 +1091,13 @@ class GiveawayCog(commands.Cog):
                 return
             
             end_timestamp = end_time.timestamp()
-            seconds_until_end = end_timestamp - now.timestamp()
-            
-            # Cancel any existing task
-            if giveaway_id in self.bot.active_giveaways:
-                self.bot.active_giveaways[giveaway_id].cancel()
             
             # Update the giveaway end time
             giveaway["end_time"] = end_timestamp
-            save_giveaways(self.giveaways)
+            self.giveaway_saver.record(giveaway_id, "update", fields={"end_time": end_timestamp})
             
-            # Reschedule the end task
-            self.bot.active_giveaways[giveaway_id] = asyncio.create_task(
-                self.schedule_giveaway_end(giveaway_id, seconds_until_end)
-            )
+            # Move the scheduled end to the new time
+            self.end_scheduler.schedule(giveaway_id, end_timestamp)
             
             # Update the original message
             try:
@@ -763,7 +1177,7 @@ class GiveawayCog(commands.Cog):
             gif_data = await attachment.read()
             
             # Save GIF to file
-            gif_path = save_gif_file(gif_id, gif_data)
+            gif_path = await save_gif_file_async(gif_id, gif_data)
             if not gif_path:
                 await interaction.followup.send("Произошла ошибка при сохранении GIF-файла.", ephemeral=True)
                 return
@@ -775,7 +1189,7 @@ class GiveawayCog(commands.Cog):
                 "uploaded_by": str(interaction.user.id),
                 "uploaded_at": datetime.now().timestamp()
             }
-            save_gifs(self.gifs)
+            await save_gifs_async(self.gifs)
             
             # Delete the message with the attachment
             try:
@@ -802,30 +1216,33 @@ class GiveawayCog(commands.Cog):
             await interaction.response.send_message("Список GIF-анимаций пуст.", ephemeral=True)
             return
         
-        # Create embed
-        embed = discord.Embed(
-            title="Список доступных GIF-анимаций",
-            color=discord.Color.blue()
-        )
-        
-        for gif_id, gif_data in self.gifs.items():
-            if isinstance(gif_data, dict):
-                name = gif_data.get("name", "Без названия")
-                upload_time = datetime.fromtimestamp(gif_data.get("uploaded_at", 0)).strftime("%d.%m.%Y %H:%M")
-                embed.add_field(
-                    name=f"ID: {gif_id}",
-                    value=f"**Название:** {name}\n**Загружено:** {upload_time}",
-                    inline=True
-                )
-            else:
-                # Handle old format if needed
-                embed.add_field(
-                    name=f"ID: {gif_id}",
-                    value=f"**Название:** {gif_data}",
-                    inline=True
-                )
+        def render_page(gif_ids, start):
+            embed = discord.Embed(
+                title="Список доступных GIF-анимаций",
+                color=discord.Color.blue()
+            )
+            for gif_id in gif_ids:
+                gif_data = self.gifs.get(gif_id)
+                if gif_data is None:
+                    continue
+                if isinstance(gif_data, dict):
+                    name = gif_data.get("name", "Без названия")
+                    upload_time = datetime.fromtimestamp(gif_data.get("uploaded_at", 0)).strftime("%d.%m.%Y %H:%M")
+                    embed.add_field(
+                        name=clip(f"ID: {gif_id}", 256),
+                        value=f"**Название:** {clip(name, 200)}\n**Загружено:** {upload_time}",
+                        inline=True
+                    )
+                else:
+                    # Handle old format if needed
+                    embed.add_field(
+                        name=clip(f"ID: {gif_id}", 256),
+                        value=f"**Название:** {clip(gif_data, 200)}",
+                        inline=True
+                    )
+            return embed
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await Paginator(list(self.gifs), render_page, LISTS_PER_PAGE).send(interaction)
         
     @app_commands.command(name="attachgif", description="Прикрепить GIF-анимацию к розыгрышу")
     @app_commands.describe(
@@ -856,7 +1273,7 @@ class GiveawayCog(commands.Cog):
         
         # Attach GIF to giveaway
         giveaway["celebration_gif"] = gif_id
-        save_giveaways(self.giveaways)
+        self.giveaway_saver.record(giveaway_id, "update", fields={"celebration_gif": gif_id})
         
         # Get GIF name for the message
         gif_name = self.gifs[gif_id]["name"] if isinstance(self.gifs[gif_id], dict) else self.gifs[gif_id]
@@ -890,26 +1307,45 @@ class GiveawayCog(commands.Cog):
             return
         
         # Process prize IDs with enhanced parsing including ranges
-        assigned_prizes, missing_prizes = parse_prize_ids(prize_ids, self.prizes)
+        try:
+            assigned_prizes, missing_prizes = parse_prize_ids(prize_ids, self.prizes, self.prize_index)
+        except ValueError:
+            await interaction.response.send_message(
+                f"Выбрано слишком много призов: за один раз можно назначить не более {PRIZE_IDS_MAX_EXPANSION}.",
+                ephemeral=True
+            )
+            return
         
         if not assigned_prizes:
             await interaction.response.send_message("Ни один из указанных ID призов не найден.", ephemeral=True)
             return
         
         # Assign prizes to the giveaway
-        giveaway["assigned_prizes"] = assigned_prizes
-        save_giveaways(self.giveaways)
+        # Prizes from the global list have no weights or limits
+        snapshot_key = await save_prize_snapshot_async(prize_snapshot(assigned_prizes))
+        if snapshot_key is None:
+            await interaction.response.send_message("Не удалось сохранить призы розыгрыша.", ephemeral=True)
+            return
+        fields = {"prize_snapshot": snapshot_key}
+        giveaway.update(fields)
+        self.giveaway_saver.record(giveaway_id, "assign", fields=fields)
         
         # Prepare response message
-        message = f"Для розыгрыша **{giveaway['title']}** назначены следующие призы:\n"
-        for pid, prize_name in assigned_prizes.items():
-            message += f"- **{prize_name}** (ID: {pid})\n"
+        message = f"Для розыгрыша **{clip(giveaway['title'], 256)}** назначены следующие призы:\n"
+        for pid, prize_name in list(assigned_prizes.items())[:ASSIGNED_PRIZES_SHOWN]:
+            message += f"- **{clip(prize_name, 50)}** (ID: {clip(pid, 30)})\n"
+        if len(assigned_prizes) > ASSIGNED_PRIZES_SHOWN:
+            message += f"... и еще {len(assigned_prizes) - ASSIGNED_PRIZES_SHOWN}\n"
         
         if missing_prizes:
-            message += f"\nСледующие ID призов не найдены: {', '.join(missing_prizes)}"
-        
-        await interaction.response.send_message(message, ephemeral=True)
-        logger.info(f"Assigned prizes {list(assigned_prizes.keys())} to giveaway {giveaway_id}")
+            # Missing parts of ranges come as spans like 4-99
+            shown = missing_prizes[:MISSING_PRIZE_SPANS_SHOWN]
+            message += f"\nСледующие ID призов не найдены: {', '.join(shown)}"
+            if len(missing_prizes) > len(shown):
+                message += f" и еще {len(missing_prizes) - len(shown)}"
+        
+        await interaction.response.send_message(clip(message, MESSAGE_LIMIT), ephemeral=True)
+        logger.info(f"Assigned {len(assigned_prizes)} prize(s) to giveaway {giveaway_id}")
     
     @app_commands.command(name="createprizelist", description="Создать список призов из текстового файла")
     @app_commands.describe(
@@ -931,11 +1367,12 @@ class GiveawayCog(commands.Cog):
         await interaction.response.send_message(
             "Пожалуйста, отправьте текстовый файл (.txt) со списком призов в следующем сообщении.\n\n"
             "Каждая строка файла должна содержать один приз в формате: `ID:Название`\n"
+            "Необязательно можно указать вес (шанс относительно других призов) и количество: `ID:Название | вес | количество`\n"
             "Например:\n"
             "```\n"
             "1:Приз №1\n"
-            "2:Приз №2\n"
-            "3:Приз №3\n"
+            "2:Приз №2 | 3\n"
+            "3:Приз №3 | 0.5 | 1\n"
             "```",
             ephemeral=True
         )
@@ -951,42 +1388,36 @@ class GiveawayCog(commands.Cog):
             # Wait for a message with an attachment
             msg = await self.bot.wait_for('message', check=check, timeout=60.0)
             
-            # Download the text file
             attachment = msg.attachments[0]
-            content = await attachment.read()
-            content_text = content.decode('utf-8')
-            
-            # Parse the prize list
-            prizes = {}
-            valid_lines = []
-            invalid_lines = []
+            if attachment.size > PRIZE_LIST_MAX_BYTES:
+                await interaction.followup.send(
+                    f"Файл слишком большой: {attachment.size // 1024} КБ, максимум {PRIZE_LIST_MAX_BYTES // 1024} КБ.",
+                    ephemeral=True
+                )
+                return
             
-            # Process each line
-            for i, line in enumerate(content_text.strip().split('\n')):
-                line = line.strip()
-                if not line or line.startswith('#'):  # Skip empty lines and comments
-                    continue
-                
-                # Check if line has the format "ID:Name"
-                if ':' in line:
-                    parts = line.split(':', 1)
-                    if len(parts) == 2:
-                        prize_id, prize_name = parts[0].strip(), parts[1].strip()
-                        if prize_id and prize_name:
-                            prizes[prize_id] = prize_name
-                            valid_lines.append(f"{prize_id}: {prize_name}")
-                            continue
-                
-                # If we reached here, the line is invalid
-                invalid_lines.append(f"Строка {i+1}: {line}")
+            # Download, parse and save the file piece by piece, so even huge lists are never held in memory whole
+            reader = PrizeListReader()
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(attachment.url) as response:
+                        response.raise_for_status()
+                        file_path = await save_prize_list_stream_async(
+                            list_id, response.content.iter_chunked(PRIZE_LIST_CHUNK_SIZE), reader
+                        )
+            except PrizeListTooLarge:
+                await interaction.followup.send(
+                    f"Файл слишком большой: допускается не более {PRIZE_LIST_MAX_BYTES // 1024} КБ "
+                    f"и {PRIZE_LIST_MAX_ROWS} призов.",
+                    ephemeral=True
+                )
+                return
             
-            # Save the prize list file
-            if not prizes:
+            prize_count = reader.prize_count
+            if not prize_count:
                 await interaction.followup.send("В файле не найдены корректные записи призов. Формат должен быть 'ID:Название'.", ephemeral=True)
                 return
             
-            # Save the file content
-            file_path = save_prize_list_file(list_id, content_text)
             if not file_path:
                 await interaction.followup.send("Произошла ошибка при сохранении файла со списком призов.", ephemeral=True)
                 return
@@ -997,9 +1428,9 @@ class GiveawayCog(commands.Cog):
                 "path": file_path,
                 "created_by": str(interaction.user.id),
                 "created_at": datetime.now().timestamp(),
-                "prize_count": len(prizes)
+                "prize_count": prize_count
             }
-            save_prize_lists(self.prize_lists)
+            await save_prize_lists_async(self.prize_lists)
             
             # Delete the message with the attachment
             try:
@@ -1010,31 +1441,32 @@ class GiveawayCog(commands.Cog):
             # Send response
             embed = discord.Embed(
                 title=f"✅ Список призов создан: {list_name}",
-                description=f"ID списка: `{list_id}`\nКоличество призов: {len(prizes)}",
+                description=f"ID списка: `{list_id}`\nКоличество призов: {prize_count}",
                 color=discord.Color.green()
             )
             
-            # Show some prizes as a preview (limit to 10)
-            preview_lines = valid_lines[:10]
+            # Show some prizes as a preview (the reader keeps the first 10)
+            preview_lines = [f"{entry.prize_id}: {format_prize_entry(entry)}" for entry in reader.preview]
             if preview_lines:
                 embed.add_field(
                     name="Предпросмотр призов",
                     value="```\n" + "\n".join(preview_lines) + "\n```" + 
-                          (f"\n... и еще {len(valid_lines) - 10} призов" if len(valid_lines) > 10 else ""),
+                          (f"\n... и еще {reader.rows - len(preview_lines)} призов" if reader.rows > len(preview_lines) else ""),
                     inline=False
                 )
             
-            # Show invalid lines if any
-            if invalid_lines:
+            # Show invalid lines if any (the reader keeps the first 5)
+            if reader.invalid_count:
+                invalid_lines = [f"Строка {line_number}: {line}" for line_number, line in reader.invalid_lines]
                 embed.add_field(
                     name="⚠️ Некорректные строки (пропущены)",
-                    value="```\n" + "\n".join(invalid_lines[:5]) + "\n```" + 
-                          (f"\n... и еще {len(invalid_lines) - 5} некорректных строк" if len(invalid_lines) > 5 else ""),
+                    value="```\n" + "\n".join(invalid_lines) + "\n```" + 
+                          (f"\n... и еще {reader.invalid_count - len(invalid_lines)} некорректных строк" if reader.invalid_count > len(invalid_lines) else ""),
                     inline=False
                 )
             
             await interaction.followup.send(embed=embed, ephemeral=True)
-            logger.info(f"User {interaction.user.id} created prize list with ID {list_id} containing {len(prizes)} prizes")
+            logger.info(f"User {interaction.user.id} created prize list with ID {list_id} containing {prize_count} prizes")
             
         except asyncio.TimeoutError:
             await interaction.followup.send("Время ожидания истекло. Пожалуйста, попробуйте снова.", ephemeral=True)
@@ -1053,32 +1485,35 @@ class GiveawayCog(commands.Cog):
             await interaction.response.send_message("Нет доступных списков призов.", ephemeral=True)
             return
         
-        # Create embed
-        embed = discord.Embed(
-            title="📋 Доступные списки призов",
-            color=discord.Color.blue()
-        )
-        
-        for list_id, list_data in self.prize_lists.items():
-            if isinstance(list_data, dict):
-                name = list_data.get("name", "Без названия")
-                prize_count = list_data.get("prize_count", "Неизвестно")
-                created_at = datetime.fromtimestamp(list_data.get("created_at", 0)).strftime("%d.%m.%Y %H:%M")
-                
-                embed.add_field(
-                    name=f"ID: {list_id}",
-                    value=f"**Название:** {name}\n**Количество призов:** {prize_count}\n**Создан:** {created_at}",
-                    inline=True
-                )
-            else:
-                # Handle old format if needed
-                embed.add_field(
-                    name=f"ID: {list_id}",
-                    value=f"**Название:** {list_data}",
-                    inline=True
-                )
+        def render_page(list_ids, start):
+            embed = discord.Embed(
+                title="📋 Доступные списки призов",
+                color=discord.Color.blue()
+            )
+            for list_id in list_ids:
+                list_data = self.prize_lists.get(list_id)
+                if list_data is None:
+                    continue
+                if isinstance(list_data, dict):
+                    name = list_data.get("name", "Без названия")
+                    prize_count = list_data.get("prize_count", "Неизвестно")
+                    created_at = datetime.fromtimestamp(list_data.get("created_at", 0)).strftime("%d.%m.%Y %H:%M")
+                    
+                    embed.add_field(
+                        name=clip(f"ID: {list_id}", 256),
+                        value=f"**Название:** {clip(name, 200)}\n**Количество призов:** {prize_count}\n**Создан:** {created_at}",
+                        inline=True
+                    )
+                else:
+                    # Handle old format if needed
+                    embed.add_field(
+                        name=clip(f"ID: {list_id}", 256),
+                        value=f"**Название:** {clip(list_data, 200)}",
+                        inline=True
+                    )
+            return embed
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await Paginator(list(self.prize_lists), render_page, LISTS_PER_PAGE).send(interaction)
         
     @app_commands.command(name="viewprizelist", description="Просмотреть содержимое списка призов")
     @app_commands.describe(list_id="ID списка призов")
@@ -1093,61 +1528,33 @@ class GiveawayCog(commands.Cog):
             await interaction.response.send_message("Список призов с указанным ID не найден.", ephemeral=True)
             return
         
-        # Load the prize list content
-        content = load_prize_list_file(list_id)
-        if content is None:
+        # Load the parsed prize list
+        prize_list = await load_parsed_prize_list_async(list_id)
+        if prize_list is None:
             await interaction.response.send_message("Не удалось загрузить содержимое списка призов.", ephemeral=True)
             return
-        
-        # Parse prizes
-        prizes = {}
-        for line in content.strip().split('\n'):
-            line = line.strip()
-            if not line or line.startswith('#'):  # Skip empty lines and comments
-                continue
-            
-            # Check if line has the format "ID:Name"
-            if ':' in line:
-                parts = line.split(':', 1)
-                if len(parts) == 2:
-                    prize_id, prize_name = parts[0].strip(), parts[1].strip()
-                    if prize_id and prize_name:
-                        prizes[prize_id] = prize_name
-        
-        # Prepare embed
+        # Entries in file order; every page is rendered from its own slice when it is shown
+        entries = list(prize_list.entries.values())
         list_data = self.prize_lists[list_id]
-        embed = discord.Embed(
-            title=f"📋 Список призов: {list_data.get('name', list_id)}",
-            description=f"ID списка: `{list_id}`\nВсего призов: {len(prizes)}",
-            color=discord.Color.blue()
-        )
-        
-        # Show prizes in chunks due to Discord's field limit
-        # We'll create multiple fields, each with up to 15 prizes
-        prize_items = list(prizes.items())
         
-        for i in range(0, len(prize_items), 15):
-            chunk = prize_items[i:i+15]
-            embed.add_field(
-                name=f"Призы {i+1}-{i+len(chunk)}",
-                value="\n".join([f"`{pid}`: {name}" for pid, name in chunk]),
-                inline=False
+        def render_page(page_entries, start):
+            lines = [f"`{clip(entry.prize_id, 50)}`: {clip(format_prize_entry(entry), 150)}" for entry in page_entries]
+            return discord.Embed(
+                title=clip(f"📋 Список призов: {list_data.get('name', list_id)}", 256),
+                description=f"ID списка: `{list_id}`\nВсего призов: {len(entries)}\n\n" + "\n".join(lines),
+                color=discord.Color.blue()
             )
         
-        # If there are too many prizes, create a file attachment
-        if len(prizes) > 50:
+        paginator = Paginator(entries, render_page, PRIZES_PER_PAGE)
+        # Large lists are attached as a file as well
+        if len(entries) > 50:
             file = discord.File(
                 fp=f"{PRIZE_LISTS_DIR}/{list_id}.txt",
                 filename=f"prizes_{list_id}.txt"
             )
-            await interaction.response.send_message(
-                content="Список призов слишком большой, поэтому прикреплен как файл:",
-                embed=embed,
-                file=file,
-                ephemeral=True
-            )
+            await paginator.send(interaction, content="Полный список призов прикреплен файлом:", file=file)
         else:
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await paginator.send(interaction)
             
     @app_commands.command(name="removeprizelist", description="Удалить список призов")
     @app_commands.describe(list_id="ID списка призов для удаления")
@@ -1167,15 +1574,10 @@ class GiveawayCog(commands.Cog):
         
         # Remove the list from memory and save
         del self.prize_lists[list_id]
-        save_prize_lists(self.prize_lists)
+        await save_prize_lists_async(self.prize_lists)
         
         # Try to delete the file
-        try:
-            file_path = f"{PRIZE_LISTS_DIR}/{list_id}.txt"
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except Exception as e:
-            logger.error(f"Error deleting prize list file: {e}")
+        await delete_prize_list_file_async(list_id)
         
         await interaction.response.send_message(f"Список призов **{list_name}** успешно удален.", ephemeral=True)
         logger.info(f"User {interaction.user.id} removed prize list with ID {list_id}")
@@ -1207,35 +1609,26 @@ class GiveawayCog(commands.Cog):
             await interaction.response.send_message("Невозможно назначить список призов для завершенного розыгрыша.", ephemeral=True)
             return
         
-        # Load the prize list
-        content = load_prize_list_file(list_id)
-        if content is None:
+        # Load the parsed prize list
+        prize_list = await load_parsed_prize_list_async(list_id)
+        if prize_list is None:
             await interaction.response.send_message("Не удалось загрузить содержимое списка призов.", ephemeral=True)
             return
-        
-        # Parse prizes
-        prizes = {}
-        for line in content.strip().split('\n'):
-            line = line.strip()
-            if not line or line.startswith('#'):  # Skip empty lines and comments
-                continue
-            
-            # Check if line has the format "ID:Name"
-            if ':' in line:
-                parts = line.split(':', 1)
-                if len(parts) == 2:
-                    prize_id, prize_name = parts[0].strip(), parts[1].strip()
-                    if prize_id and prize_name:
-                        prizes[prize_id] = prize_name
+        prizes = prize_list.prizes
         
         if not prizes:
             await interaction.response.send_message("В выбранном списке призов не найдено ни одного корректного приза.", ephemeral=True)
             return
         
-        # Assign prizes to the giveaway
-        giveaway["assigned_prizes"] = prizes
-        giveaway["prize_list_id"] = list_id
-        save_giveaways(self.giveaways)
+        # The giveaway references an immutable snapshot of the list as it is now,
+        # shared by every giveaway the same version of the list is assigned to
+        snapshot_key = await save_prize_snapshot_async(prize_snapshot(prizes, prize_list.weights, prize_list.quantities))
+        if snapshot_key is None:
+            await interaction.response.send_message("Не удалось сохранить призы розыгрыша.", ephemeral=True)
+            return
+        fields = {"prize_snapshot": snapshot_key, "prize_list_id": list_id}
+        giveaway.update(fields)
+        self.giveaway_saver.record(giveaway_id, "assign", fields=fields)
         
         # Get list name
         list_name = self.prize_lists[list_id].get("name", list_id) if isinstance(self.prize_lists[list_id], dict) else self.prize_lists[list_id]
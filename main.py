@@ -62,6 +62,7 @@ async def run_bot_with_retry(token):
     rate_limit_reset = 0
     
     while retry_count < MAX_RETRIES:
+        bot = None
         try:
             # Log attempt information
             logger.info(f"Starting bot (attempt {retry_count + 1}/{MAX_RETRIES}, total attempts: {total_retry_attempt + 1})")
@@ -119,6 +120,14 @@ async def run_bot_with_retry(token):
             logger.error(f"Unexpected error: {type(e).__name__}: {e}")
             import traceback
             logger.error(traceback.format_exc())
+        finally:
+            # Close the failed instance so buffered giveaway changes are flushed
+            # and its background tasks don't outlive it
+            if bot is not None and not bot.is_closed():
+                try:
+                    await bot.close()
+                except Exception as e:
+                    logger.error(f"Error closing bot instance: {e}")
         
         # Increment retry count and wait before next attempt
         retry_count += 1
@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Mapping with a fixed number of entries that evicts the least recently used one"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def keys(self):
+        return list(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+class TTLCache:
+    """LRU cache whose entries also expire ttl seconds after they were stored"""
+
+    def __init__(self, maxsize=128, ttl=60.0):
+        self.ttl = ttl
+        # key -> (value, monotonic expiry time)
+        self._cache = LRUCache(maxsize)
+
+    def get(self, key, default=None):
+        entry = self._cache.get(key)
+        if entry is None:
+            return default
+        if entry[1] <= time.monotonic():
+            self._cache.pop(key)
+            return default
+        return entry[0]
+
+    def put(self, key, value):
+        self._cache.put(key, (value, time.monotonic() + self.ttl))
+
+    def pop(self, key, default=None):
+        entry = self._cache.pop(key)
+        return default if entry is None else entry[0]
+
+    def discard_if(self, predicate):
+        """Drop every entry whose key matches predicate, returns how many were dropped"""
+        keys = [key for key in self._cache.keys() if predicate(key)]
+        for key in keys:
+            self._cache.pop(key)
+        return len(keys)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
@@ -1,6 +1,26 @@
 import json
 import os
+import time
+import asyncio
 import logging
+import shutil
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.sqlite_backend import SqliteStorage, SqliteGiveawayJournal
+from utils.participants import ParticipantRoster
+from utils.cache import LRUCache
+from utils.prizes import PrizeIdIndex, missing_spans, parse_prize_list, prize_snapshot, snapshot_id
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 logger = logging.getLogger(__name__)
 
@@ -8,10 +28,57 @@ logger = logging.getLogger(__name__)
 DATA_DIR = "data"
 IMAGES_DIR = f"{DATA_DIR}/images"
 PRIZE_LISTS_DIR = f"{DATA_DIR}/prize_lists"
+PRIZE_SNAPSHOTS_DIR = f"{DATA_DIR}/prize_snapshots"
 GIVEAWAYS_FILE = f"{DATA_DIR}/giveaways.json"
 PRIZES_FILE = f"{DATA_DIR}/prizes.json"
 GIFS_FILE = f"{DATA_DIR}/gifs.json"
 PRIZE_LISTS_FILE = f"{DATA_DIR}/prize_lists.json"
+# Append-only log of giveaway changes made since the last giveaways.json snapshot
+GIVEAWAYS_JOURNAL_FILE = f"{DATA_DIR}/giveaways.journal"
+SQLITE_FILE = f"{DATA_DIR}/mysterybox.db"
+# Ended giveaways, one file per month of creation
+ARCHIVE_DIR = f"{DATA_DIR}/archive"
+
+# Storage backend: "json" (files in data/) or "sqlite" (SQLITE_FILE)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+
+# Write-behind settings for the giveaways file
+# Pending changes are flushed at most FLUSH_INTERVAL seconds after the first one,
+# or immediately once FLUSH_MAX_PENDING mutations have piled up
+FLUSH_INTERVAL = float(os.getenv("GIVEAWAYS_FLUSH_INTERVAL", "5"))
+FLUSH_MAX_PENDING = int(os.getenv("GIVEAWAYS_FLUSH_MAX_PENDING", "500"))
+
+# Ended giveaways are moved out of the live set this many hours after they end
+ARCHIVE_AFTER_HOURS = float(os.getenv("GIVEAWAYS_ARCHIVE_AFTER_HOURS", "72"))
+# Number of archive month files kept in memory after a lookup
+ARCHIVE_CACHE_SEGMENTS = 4
+
+# Set FSYNC_WRITES=true to fsync every data file before it replaces the old one.
+# Snapshots are already coalesced by the write-behind flusher, so this costs
+# one fsync per flush rather than one per change
+FSYNC_WRITES = os.getenv("FSYNC_WRITES", "false").lower() == "true"
+# Rolling backups kept next to each JSON data file, and the minimum time between them
+BACKUP_COUNT = int(os.getenv("BACKUP_COUNT", "3"))
+BACKUP_INTERVAL = float(os.getenv("BACKUP_INTERVAL_MINUTES", "10")) * 60
+
+# Parsed prize list files kept in memory, and how often (seconds) a cached
+# one is checked against the file on disk for changes made by hand
+PRIZE_LIST_CACHE_SIZE = 32
+PRIZE_LIST_CHECK_INTERVAL = float(os.getenv("PRIZE_LIST_CHECK_INTERVAL", "30"))
+# Prize snapshots kept in memory; they never change, so no check is needed
+PRIZE_SNAPSHOT_CACHE_SIZE = 64
+# Most prizes one /assignprizes call may select, ranges included
+PRIZE_IDS_MAX_EXPANSION = int(os.getenv("PRIZE_IDS_MAX_EXPANSION", "1000"))
+
+# Threads used for disk work so it never blocks the event loop
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+
+# Encoding of the files only the bot reads (giveaways snapshot, archive):
+# "auto" and "orjson" write compact JSON with orjson when it is installed,
+# "json" sticks to the standard library, "msgpack" writes MessagePack.
+# Files people edit by hand (prizes, GIFs, prize lists) stay indented JSON.
+# Every format is recognised on load, so the setting can be changed at any time
+DATA_CODEC = os.getenv("DATA_CODEC", "auto").lower()
 
 def ensure_data_directory():
     """Ensure the data directory exists"""
@@ -28,85 +95,726 @@ def ensure_data_directory():
     if not os.path.exists(PRIZE_LISTS_DIR):
         os.makedirs(PRIZE_LISTS_DIR)
         logger.info(f"Created prize lists directory: {PRIZE_LISTS_DIR}")
+    
+    # Create prize snapshots directory if it doesn't exist
+    if not os.path.exists(PRIZE_SNAPSHOTS_DIR):
+        os.makedirs(PRIZE_SNAPSHOTS_DIR)
+        logger.info(f"Created prize snapshots directory: {PRIZE_SNAPSHOTS_DIR}")
 
-def load_giveaways():
-    """Load giveaways from json file"""
-    ensure_data_directory()
+_sqlite_storage = None
+
+# Reads and per-ID files (GIFs, prize list files) can run in parallel
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="storage-io")
+# Shared files are rewritten by a single thread so saves land in the order they were made
+_ordered_io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-writer")
+
+async def run_io(func, *args, ordered=False):
+    """Run a blocking storage call in the I/O thread pool"""
+    executor = _ordered_io_executor if ordered else _io_executor
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+def use_sqlite():
+    """Check whether the SQLite backend is selected"""
+    return STORAGE_BACKEND == "sqlite"
+
+def get_sqlite_storage():
+    """Open the SQLite database, importing the JSON files on first use"""
+    global _sqlite_storage
+    if _sqlite_storage is None:
+        ensure_data_directory()
+        _sqlite_storage = SqliteStorage(SQLITE_FILE)
+        if not _sqlite_storage.get_meta("json_migrated"):
+            migrate_json_to_sqlite(_sqlite_storage)
+        # Separate flag: databases imported by earlier versions are missing the archive
+        if not _sqlite_storage.get_meta("json_archive_migrated"):
+            migrate_json_archive_to_sqlite(_sqlite_storage)
+    return _sqlite_storage
+
+def migrate_json_to_sqlite(storage):
+    """One-shot import of the data/*.json files into SQLite"""
+    giveaways = _load_data_file(GIVEAWAYS_FILE, "giveaways")
+    # Large rosters are stored packed, SQLite needs them one participant per row
+    for giveaway in giveaways.values():
+        _index_participants(giveaway)
+    # Changes that never made it into the snapshot are part of the data too
+    GiveawayJournal().replay(giveaways)
+    storage.save_giveaways(giveaways, with_participants=True)
+    storage.save_documents("prizes", _load_data_file(PRIZES_FILE, "prizes"))
+    storage.save_documents("gifs", _load_data_file(GIFS_FILE, "GIFs"))
+    storage.save_documents("prize_lists", _load_data_file(PRIZE_LISTS_FILE, "prize lists"))
+    for file_name in os.listdir(PRIZE_SNAPSHOTS_DIR):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            snapshot = _load_prize_snapshot_file(file_name[:-len(".json")])
+        except Exception as e:
+            logger.error(f"Error loading prize snapshot {file_name}: {e}")
+            continue
+        if snapshot is not None:
+            storage.add_document("prize_snapshots", snapshot_id(snapshot), snapshot)
+    storage.set_meta("json_migrated", "1")
+    logger.info(f"Migrated {len(giveaways)} giveaway(s) from JSON files to {storage.path}")
+
+def migrate_json_archive_to_sqlite(storage):
+    """One-shot import of the data/archive/*.json segments into SQLite as archived giveaways"""
+    imported = 0
+    if os.path.isdir(ARCHIVE_DIR):
+        for file_name in sorted(os.listdir(ARCHIVE_DIR)):
+            if not file_name.endswith(".json"):
+                continue
+            segment = file_name[:-len(".json")]
+            archived = _load_data_file(f"{ARCHIVE_DIR}/{file_name}", f"archive {segment}")
+            # A giveaway that already has a row was written through SQLite and is newer
+            archived = {
+                giveaway_id: giveaway for giveaway_id, giveaway in archived.items()
+                if storage.load_giveaway(giveaway_id) is None
+            }
+            if not archived:
+                continue
+            for giveaway in archived.values():
+                _index_participants(giveaway)
+            storage.save_giveaways(archived, with_participants=True)
+            storage.archive_giveaways(list(archived))
+            imported += len(archived)
+    storage.set_meta("json_archive_migrated", "1")
+    if imported:
+        logger.info(f"Migrated {imported} archived giveaway(s) from {ARCHIVE_DIR} to {storage.path}")
+
+def _resolve_codec(name):
+    if name == "msgpack":
+        if msgpack is not None:
+            return "msgpack"
+        logger.warning("DATA_CODEC=msgpack but msgpack is not installed, using JSON")
+    elif name == "json":
+        return "json"
+    elif name not in ("auto", "orjson"):
+        logger.warning(f"Unknown DATA_CODEC {name!r}, using JSON")
+    return "orjson" if orjson is not None else "json"
+
+_codec = _resolve_codec(DATA_CODEC)
+
+def _dumps_json(data, pretty=False):
+    """Encode data as UTF-8 JSON bytes, compact unless pretty is set"""
+    if pretty:
+        return json.dumps(data, indent=4, ensure_ascii=False, default=_json_default).encode('utf-8')
+    if orjson is not None and _codec != "json":
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+def _loads_json(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _dumps(data, pretty=False):
+    """Encode a data file with the configured codec, or as indented JSON if pretty is set"""
+    if not pretty and _codec == "msgpack":
+        return msgpack.packb(data, default=_json_default, use_bin_type=True)
+    return _dumps_json(data, pretty)
+
+def _loads(raw):
+    """Decode a data file written by any of the codecs"""
+    head = raw.lstrip()[:1]
+    if not head:
+        raise ValueError("file is empty")
+    # A JSON document starts with an object or an array, a MessagePack map never starts with "{"
+    if head in (b"{", b"["):
+        return _loads_json(raw)
+    if msgpack is None:
+        raise ValueError("file is not JSON and msgpack is not installed")
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+def _backup_paths(path):
+    return [f"{path}.bak{n}" for n in range(1, BACKUP_COUNT + 1)]
+
+def _load_data_file(path, what):
+    """Load a data file, falling back to its newest readable backup"""
+    backups = sorted(
+        (backup for backup in _backup_paths(path) if os.path.exists(backup)),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    for candidate in [path] + backups:
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, 'rb') as f:
+                data = _loads(f.read())
+        except Exception as e:
+            logger.error(f"Error loading {what} from {candidate}: {e}")
+            continue
+        if candidate != path:
+            logger.warning(f"Loaded {what} from backup {candidate}")
+        return data
+    return {}
+
+_last_backup_at = {}
+
+def _take_backup(path):
+    """Keep the current version of a file as a backup before it is replaced
+
+    The backup is a hard link to the existing file, so no data is copied and
+    the rename that swaps in the new version stays the only rename per
+    write. The oldest backup slot is reused.
+    """
+    if BACKUP_COUNT <= 0 or not os.path.exists(path):
+        return
+    now = time.monotonic()
+    last_backup_at = _last_backup_at.get(path)
+    if last_backup_at is not None and now - last_backup_at < BACKUP_INTERVAL:
+        return
+    slots = _backup_paths(path)
+    slot = next((slot for slot in slots if not os.path.exists(slot)), None)
+    if slot is None:
+        slot = min(slots, key=os.path.getmtime)
     try:
-        if os.path.exists(GIVEAWAYS_FILE):
-            with open(GIVEAWAYS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            return {}
+        if os.path.exists(slot):
+            os.remove(slot)
+        try:
+            os.link(path, slot)
+        except OSError:
+            # Filesystem without hard links
+            shutil.copy2(path, slot)
+        _last_backup_at[path] = now
+    except Exception as e:
+        logger.warning(f"Could not back up {path}: {e}")
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        # Directories can't be opened on every platform
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+_temp_file_ids = itertools.count()
+
+def _open_temp_file(path):
+    """Open a new temp file next to path for writing, returns (file, temp path)
+
+    Every call gets its own name, so concurrent writers of the same file
+    never write into (or rename away) each other's temp file.
+    """
+    tmp_path = f"{path}.{os.getpid()}-{next(_temp_file_ids)}.tmp"
+    return open(tmp_path, 'xb'), tmp_path
+
+def _write_file(path, data, backup=False):
+    """Atomically replace a file with data (bytes)
+
+    The data goes to a temp file next to the target which is then renamed
+    over it, so a crash mid-write leaves the previous version intact.
+    """
+    f, tmp_path = _open_temp_file(path)
+    try:
+        with f:
+            f.write(data)
+            if FSYNC_WRITES:
+                f.flush()
+                os.fsync(f.fileno())
+        if backup:
+            _take_backup(path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if FSYNC_WRITES:
+        _fsync_directory(os.path.dirname(path))
+
+def _write_data_file(path, data, backup=True, pretty=False):
+    """Atomically replace a data file, keeping rolling backups"""
+    _write_file(path, _dumps(data, pretty), backup=backup)
+
+def _load_documents(table, what):
+    try:
+        return get_sqlite_storage().load_documents(table)
     except Exception as e:
-        logger.error(f"Error loading giveaways: {e}")
+        logger.error(f"Error loading {what}: {e}")
         return {}
 
-def save_giveaways(giveaways):
-    """Save giveaways to json file"""
+def _save_documents(table, documents, what):
+    try:
+        get_sqlite_storage().save_documents(table, documents)
+    except Exception as e:
+        logger.error(f"Error saving {what}: {e}")
+
+def create_giveaway_journal():
+    """Create the change journal for the selected backend"""
+    if use_sqlite():
+        return SqliteGiveawayJournal(get_sqlite_storage(), _ordered_io_executor)
+    return GiveawayJournal()
+
+def _json_default(obj):
+    """Serialize the in-memory helper types used inside giveaways"""
+    if isinstance(obj, ParticipantRoster):
+        return obj.to_stored()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _index_participants(giveaway):
+    """Replace the stored participants with a ParticipantRoster"""
+    participants = giveaway.get("participants")
+    if not isinstance(participants, ParticipantRoster):
+        participants = giveaway["participants"] = ParticipantRoster.from_stored(participants)
+    return participants
+
+def load_giveaways():
+    """Load giveaways from storage"""
     ensure_data_directory()
+    if use_sqlite():
+        try:
+            giveaways = get_sqlite_storage().load_giveaways()
+        except Exception as e:
+            logger.error(f"Error loading giveaways: {e}")
+            giveaways = {}
+    else:
+        giveaways = _load_data_file(GIVEAWAYS_FILE, "giveaways")
+    for giveaway in giveaways.values():
+        participants = _index_participants(giveaway)
+        if giveaway.get("ended", False):
+            participants.release_index()
+    return giveaways
+
+def save_giveaways(giveaways, giveaway_ids=None):
+    """Save giveaways to storage, returns True on success
+
+    giveaway_ids narrows the write to the giveaways that changed where the
+    backend supports it; the JSON file is always rewritten as a whole.
+    """
+    ensure_data_directory()
+    if use_sqlite():
+        try:
+            get_sqlite_storage().save_giveaways(
+                giveaways, giveaway_ids, with_participants=giveaway_ids is None
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error saving giveaways: {e}")
+            return False
     try:
-        with open(GIVEAWAYS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(giveaways, f, indent=4, ensure_ascii=False)
+        _write_data_file(GIVEAWAYS_FILE, giveaways)
+        return True
     except Exception as e:
         logger.error(f"Error saving giveaways: {e}")
+        return False
 
-def load_prizes():
-    """Load prizes from json file"""
-    ensure_data_directory()
+_archive_cache = LRUCache(maxsize=ARCHIVE_CACHE_SEGMENTS)
+_archive_lock = threading.Lock()
+
+def _archive_segment(giveaway_id):
+    """Archive file (YYYY-MM of creation) a giveaway belongs to, derived from its ID"""
     try:
-        if os.path.exists(PRIZES_FILE):
-            with open(PRIZES_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            return {}
+        created_at = float(giveaway_id.rsplit("-", 1)[1])
+        return time.strftime("%Y-%m", time.gmtime(created_at))
+    except (IndexError, ValueError, OverflowError, OSError):
+        return "unsorted"
+
+def _archivable_giveaways(giveaways, ended_before):
+    return [
+        giveaway_id for giveaway_id, giveaway in giveaways.items()
+        if giveaway.get("ended", False) and giveaway.get("ended_at", giveaway.get("end_time", 0)) < ended_before
+    ]
+
+def _store_archived_giveaways(archived):
+    """Write giveaways (ID -> giveaway) to the archive"""
+    if use_sqlite():
+        get_sqlite_storage().archive_giveaways(list(archived))
+        return
+    segments = {}
+    for giveaway_id in archived:
+        segments.setdefault(_archive_segment(giveaway_id), []).append(giveaway_id)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    for segment, giveaway_ids in segments.items():
+        path = f"{ARCHIVE_DIR}/{segment}.json"
+        with _archive_lock:
+            segment_data = _load_data_file(path, f"archive {segment}")
+            for giveaway_id in giveaway_ids:
+                segment_data[giveaway_id] = archived[giveaway_id]
+            _write_data_file(path, segment_data, backup=False)
+            _archive_cache.pop(segment)
+
+async def archive_giveaways_async(giveaways, ended_before):
+    """Move giveaways that ended before the given timestamp out of the live set, returns their IDs
+
+    The archive is written from the I/O thread pool.
+    """
+    archived = _archivable_giveaways(giveaways, ended_before)
+    if not archived:
+        return []
+    snapshot = _snapshot_giveaways({giveaway_id: giveaways[giveaway_id] for giveaway_id in archived})
+    try:
+        await run_io(_store_archived_giveaways, snapshot, ordered=True)
     except Exception as e:
-        logger.error(f"Error loading prizes: {e}")
-        return {}
+        logger.error(f"Error archiving giveaways: {e}")
+        return []
+    # Only drop them from the live set once they are safely in the archive
+    for giveaway_id in archived:
+        giveaways.pop(giveaway_id, None)
+    return archived
+
+def load_archived_giveaway(giveaway_id):
+    """Look up an archived giveaway, loading its archive file on demand"""
+    try:
+        if use_sqlite():
+            giveaway = get_sqlite_storage().load_giveaway(giveaway_id)
+            if giveaway is not None:
+                _index_participants(giveaway).release_index()
+            return giveaway
+        
+        segment = _archive_segment(giveaway_id)
+        with _archive_lock:
+            segment_data = _archive_cache.get(segment)
+            if segment_data is None:
+                segment_data = _load_data_file(f"{ARCHIVE_DIR}/{segment}.json", f"archive {segment}")
+                _archive_cache.put(segment, segment_data)
+            giveaway = segment_data.get(giveaway_id)
+            if giveaway is not None:
+                _index_participants(giveaway).release_index()
+            return giveaway
+    except Exception as e:
+        logger.error(f"Error loading archived giveaway {giveaway_id}: {e}")
+        return None
+
+async def load_archived_giveaway_async(giveaway_id):
+    """load_archived_giveaway() run in the I/O thread pool"""
+    return await run_io(load_archived_giveaway, giveaway_id)
+
+def apply_journal_entry(giveaways, entry):
+    """Apply a single journal record to the giveaways dict"""
+    op = entry["op"]
+    giveaway_id = entry["id"]
+    
+    if op == "create":
+        giveaways[giveaway_id] = entry["giveaway"]
+        _index_participants(giveaways[giveaway_id])
+        return
+    
+    giveaway = giveaways.get(giveaway_id)
+    if giveaway is None:
+        logger.warning(f"Journal entry {op} refers to unknown giveaway {giveaway_id}")
+        return
+    
+    if op == "join":
+        _index_participants(giveaway).add(entry["user"])
+    elif op == "leave":
+        _index_participants(giveaway).discard(entry["user"])
+    elif op in ("end", "cancel"):
+        giveaway["ended"] = True
+        if "ended_at" in entry:
+            giveaway["ended_at"] = entry["ended_at"]
+        _index_participants(giveaway).release_index()
+    elif op in ("assign", "update"):
+        giveaway.update(entry["fields"])
+    else:
+        logger.warning(f"Unknown journal operation: {op}")
+
+class GiveawayJournal:
+    """Append-only log of giveaway changes
+
+    Each change is one compact JSON line, so recording it costs the same no
+    matter how large giveaways.json is. The journal is replayed on top of the
+    last snapshot at startup and emptied every time a new snapshot is written.
+
+    While a snapshot is being written in the background the journal is
+    rotated: records made before the snapshot move to a ".1" file that is
+    deleted once the snapshot lands, new records keep going to a fresh file.
+    """
+
+    def __init__(self, path=GIVEAWAYS_JOURNAL_FILE):
+        self.path = path
+        self.rotated_path = f"{path}.1"
+        self._file = None
+
+    def append(self, op, giveaway_id, **data):
+        """Append one record and hand it to the OS right away"""
+        self.append_many(op, giveaway_id, [data])
+
+    def append_many(self, op, giveaway_id, records):
+        """Append several records of the same operation with a single write"""
+        # Always JSON, whatever DATA_CODEC is: the journal has to stay line-oriented
+        lines = b"".join(
+            _dumps_json({"op": op, "id": giveaway_id, **data}) + b"\n"
+            for data in records
+        )
+        try:
+            if self._file is None:
+                ensure_data_directory()
+                self._file = open(self.path, 'ab')
+            self._file.write(lines)
+            self._file.flush()
+        except Exception as e:
+            logger.error(f"Error writing giveaways journal: {e}")
+
+    def replay(self, giveaways):
+        """Apply all journal records to giveaways, returns the number applied"""
+        applied = 0
+        for path in (self.rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    for line_number, line in enumerate(f, 1):
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entry = _loads_json(line)
+                        except ValueError:
+                            # Most likely the tail of a write interrupted by a crash
+                            logger.warning(f"Skipping unreadable line {line_number} in {path}")
+                            continue
+                        apply_journal_entry(giveaways, entry)
+                        applied += 1
+            except Exception as e:
+                logger.error(f"Error replaying giveaways journal {path}: {e}")
+        return applied
+
+    def has_entries(self):
+        """Check whether the journal files hold anything"""
+        return any(
+            os.path.exists(path) and os.path.getsize(path) > 0
+            for path in (self.rotated_path, self.path)
+        )
+
+    def rotate(self):
+        """Set the current records aside before a snapshot is taken"""
+        # If an earlier snapshot failed its records are still set aside;
+        # keep appending to the current file, replaying both is harmless
+        if os.path.exists(self.rotated_path) or not os.path.exists(self.path):
+            return
+        try:
+            self.close()
+            os.replace(self.path, self.rotated_path)
+        except Exception as e:
+            logger.error(f"Error rotating giveaways journal: {e}")
+
+    def drop_rotated(self):
+        """Delete the records set aside by rotate() once a snapshot covers them"""
+        try:
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+        except Exception as e:
+            logger.error(f"Error removing rotated giveaways journal: {e}")
+
+    def truncate(self):
+        """Drop all records once they are covered by a snapshot"""
+        self.drop_rotated()
+        try:
+            self.close()
+            self._file = open(self.path, 'wb')
+        except Exception as e:
+            logger.error(f"Error truncating giveaways journal: {e}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def _snapshot_giveaways(giveaways, giveaway_ids=None, with_participants=True):
+    """Copy giveaways (or only giveaway_ids) into their stored form so they can be written from another thread
+
+    Without with_participants the rosters are left out instead of encoded.
+    """
+    snapshot = {}
+    for giveaway_id in giveaways.keys() if giveaway_ids is None else giveaway_ids:
+        giveaway = giveaways.get(giveaway_id)
+        if giveaway is None:
+            continue
+        giveaway = dict(giveaway)
+        participants = giveaway.get("participants")
+        if not with_participants:
+            giveaway.pop("participants", None)
+        elif isinstance(participants, ParticipantRoster):
+            giveaway["participants"] = participants.to_stored()
+        snapshot[giveaway_id] = giveaway
+    return snapshot
+
+class GiveawayWriteBehind:
+    """Coalesces giveaway mutations and writes them to disk in the background
+
+    Handlers call record() instead of save_giveaways(): the change goes to the
+    journal immediately, while the full snapshot is rewritten once per burst
+    on the I/O thread.
+    """
+
+    def __init__(self, giveaways, flush_interval=FLUSH_INTERVAL, max_pending=FLUSH_MAX_PENDING, journal=None):
+        self.giveaways = giveaways
+        self.journal = journal if journal is not None else create_giveaway_journal()
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dirty = set()
+        self.pending = 0
+        self._first_dirty_at = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+
+    def start(self):
+        """Start the background flush task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def replay_journal(self):
+        """Bring giveaways up to date with the journal and checkpoint the result
+
+        Runs once at startup, before anything else touches the data, so it
+        writes synchronously.
+        """
+        if not self.journal.has_entries():
+            return 0
+        applied = self.journal.replay(self.giveaways)
+        # Fold the replayed changes into a fresh snapshot so the journal
+        # (including any torn final line) can be started over
+        if save_giveaways(self.giveaways):
+            self.journal.truncate()
+        logger.info(f"Replayed {applied} giveaway journal record(s)")
+        return applied
+
+    def record(self, giveaway_id, op, **data):
+        """Journal a change to a giveaway and schedule a snapshot"""
+        self.journal.append(op, giveaway_id, **data)
+        self.mark_dirty(giveaway_id)
+
+    def record_many(self, giveaway_id, op, records):
+        """Journal a batch of changes of the same kind to one giveaway"""
+        if not records:
+            return
+        self.journal.append_many(op, giveaway_id, records)
+        self.mark_dirty(giveaway_id, len(records))
+
+    def mark_dirty(self, giveaway_id, count=1):
+        """Record that a giveaway changed and needs to be written"""
+        self.dirty.add(giveaway_id)
+        self.pending += count
+        if self._first_dirty_at is None:
+            self._first_dirty_at = time.monotonic()
+        # Wake the flusher on the first change (to arm the interval) and on overflow
+        if self.pending == count or self.pending >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self):
+        """Write pending changes to disk right away"""
+        async with self._flush_lock:
+            if not self.dirty:
+                return
+            dirty = set(self.dirty)
+            pending = self.pending
+            self.dirty.clear()
+            self.pending = 0
+            self._first_dirty_at = None
+            
+            # The copy is taken on the event loop, so it is consistent with the
+            # journal rotation; only serialization and disk writes leave the loop
+            if use_sqlite():
+                # Participants are already in SQLite row by row, only the dirty rows are rewritten
+                snapshot = _snapshot_giveaways(self.giveaways, dirty, with_participants=False)
+            else:
+                snapshot = _snapshot_giveaways(self.giveaways)
+            self.journal.rotate()
+            if not await run_io(save_giveaways, snapshot, dirty, ordered=True):
+                # Keep the journal and try again on the next change
+                self.dirty |= dirty
+                return
+            self.journal.drop_rotated()
+            logger.debug(f"Flushed {pending} giveaway change(s) across {len(dirty)} giveaway(s)")
+
+    async def _run(self):
+        while True:
+            try:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if self._first_dirty_at is not None and self.pending < self.max_pending:
+                    # Wait out the rest of the interval unless the backlog overflows first
+                    remaining = self.flush_interval - (time.monotonic() - self._first_dirty_at)
+                    if remaining > 0:
+                        try:
+                            await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                        self._wakeup.clear()
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in giveaways flush task: {e}")
+
+    async def close(self):
+        """Stop the background task and write everything that is still pending"""
+        if self._task is not None:
+            # Don't interrupt a flush halfway through
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self.journal.close()
+
+def load_prizes():
+    """Load prizes from storage"""
+    ensure_data_directory()
+    if use_sqlite():
+        return _load_documents("prizes", "prizes")
+    return _load_data_file(PRIZES_FILE, "prizes")
 
 def save_prizes(prizes):
-    """Save prizes to json file"""
+    """Save prizes to storage"""
     ensure_data_directory()
+    if use_sqlite():
+        _save_documents("prizes", prizes, "prizes")
+        return
     try:
-        with open(PRIZES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(prizes, f, indent=4, ensure_ascii=False)
+        _write_data_file(PRIZES_FILE, prizes, pretty=True)
     except Exception as e:
         logger.error(f"Error saving prizes: {e}")
 
+async def save_prizes_async(prizes):
+    """save_prizes() run in the I/O thread pool"""
+    await run_io(save_prizes, dict(prizes), ordered=True)
+
 def load_gifs():
-    """Load celebration GIFs from json file"""
+    """Load celebration GIFs from storage"""
     ensure_data_directory()
-    try:
-        if os.path.exists(GIFS_FILE):
-            with open(GIFS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            return {}
-    except Exception as e:
-        logger.error(f"Error loading GIFs: {e}")
-        return {}
+    if use_sqlite():
+        return _load_documents("gifs", "GIFs")
+    return _load_data_file(GIFS_FILE, "GIFs")
 
 def save_gifs(gifs):
-    """Save celebration GIFs to json file"""
+    """Save celebration GIFs to storage"""
     ensure_data_directory()
+    if use_sqlite():
+        _save_documents("gifs", gifs, "GIFs")
+        return
     try:
-        with open(GIFS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(gifs, f, indent=4, ensure_ascii=False)
+        _write_data_file(GIFS_FILE, gifs, pretty=True)
     except Exception as e:
         logger.error(f"Error saving GIFs: {e}")
         
+async def save_gifs_async(gifs):
+    """save_gifs() run in the I/O thread pool"""
+    await run_io(save_gifs, dict(gifs), ordered=True)
+
 def save_gif_file(gif_id, gif_data):
     """Save GIF binary data to file"""
     ensure_data_directory()
     try:
         gif_path = f"{IMAGES_DIR}/{gif_id}.gif"
-        with open(gif_path, 'wb') as f:
-            f.write(gif_data)
+        _write_file(gif_path, gif_data)
         return gif_path
     except Exception as e:
         logger.error(f"Error saving GIF file: {e}")
         return None
 
+async def save_gif_file_async(gif_id, gif_data):
+    """save_gif_file() run in the I/O thread pool"""
+    return await run_io(save_gif_file, gif_id, gif_data)
+
 def get_gif_path(gif_id):
     """Get path to a GIF file by ID"""
     gif_path = f"{IMAGES_DIR}/{gif_id}.gif"
@@ -115,45 +823,85 @@ def get_gif_path(gif_id):
     return None
 
 def load_prize_lists():
-    """Load prize lists metadata from json file"""
+    """Load prize lists metadata from storage"""
     ensure_data_directory()
-    try:
-        if os.path.exists(PRIZE_LISTS_FILE):
-            with open(PRIZE_LISTS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            return {}
-    except Exception as e:
-        logger.error(f"Error loading prize lists: {e}")
-        return {}
+    if use_sqlite():
+        return _load_documents("prize_lists", "prize lists")
+    return _load_data_file(PRIZE_LISTS_FILE, "prize lists")
 
 def save_prize_lists(prize_lists):
-    """Save prize lists metadata to json file"""
+    """Save prize lists metadata to storage"""
     ensure_data_directory()
+    if use_sqlite():
+        _save_documents("prize_lists", prize_lists, "prize lists")
+        return
     try:
-        with open(PRIZE_LISTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(prize_lists, f, indent=4, ensure_ascii=False)
+        _write_data_file(PRIZE_LISTS_FILE, prize_lists, pretty=True)
     except Exception as e:
         logger.error(f"Error saving prize lists: {e}")
 
-def save_prize_list_file(list_id, prize_data):
-    """Save a prize list to a text file"""
-    ensure_data_directory()
+async def save_prize_lists_async(prize_lists):
+    """save_prize_lists() run in the I/O thread pool"""
+    await run_io(save_prize_lists, dict(prize_lists), ordered=True)
+
+async def save_prize_list_stream_async(list_id, chunks, reader):
+    """Write an uploaded prize list to its file as it arrives
+
+    Every chunk from the async iterator chunks goes through reader (a
+    PrizeListReader) and the normalized lines it returns are appended to a
+    temp file on the I/O thread pool. The temp file replaces the list's
+    file only if the upload ends with at least one prize, so returns the
+    file path, or None if there were no prizes or the file could not be
+    written. Errors raised by the reader or the download are passed on;
+    the previous file is left untouched either way.
+    """
+    await run_io(ensure_data_directory)
+    file_path = f"{PRIZE_LISTS_DIR}/{list_id}.txt"
+    f, tmp_path = await run_io(_open_temp_file, file_path)
+    committed = False
     try:
-        file_path = f"{PRIZE_LISTS_DIR}/{list_id}.txt"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(prize_data)
+        async for chunk in chunks:
+            data = reader.feed(chunk)
+            if data:
+                await run_io(f.write, data)
+        await run_io(f.write, reader.close())
+        if not reader.prize_count:
+            return None
+        await run_io(_commit_file, f, tmp_path, file_path)
+        committed = True
+        _forget_prize_list(list_id)
         return file_path
-    except Exception as e:
+    except OSError as e:
         logger.error(f"Error saving prize list file: {e}")
         return None
+    finally:
+        if not committed:
+            await run_io(_discard_file, f, tmp_path)
+
+def _commit_file(f, tmp_path, path):
+    """Close a fully written temp file and move it over path"""
+    if FSYNC_WRITES:
+        f.flush()
+        os.fsync(f.fileno())
+    f.close()
+    os.replace(tmp_path, path)
+    if FSYNC_WRITES:
+        _fsync_directory(os.path.dirname(path))
+
+def _discard_file(f, tmp_path):
+    f.close()
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
 
 def load_prize_list_file(list_id):
     """Load a prize list from a text file"""
     try:
         file_path = f"{PRIZE_LISTS_DIR}/{list_id}.txt"
         if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
+            # utf-8-sig drops the BOM some editors put at the start
+            with open(file_path, 'r', encoding='utf-8-sig') as f:
                 return f.read()
         else:
             logger.error(f"Prize list file not found: {file_path}")
@@ -162,8 +910,194 @@ def load_prize_list_file(list_id):
         logger.error(f"Error loading prize list file: {e}")
         return None
 
-def parse_prize_ids(prize_ids_str, prizes):
-    """Parse prize IDs, including ranges like '1-3'"""
+def delete_prize_list_file(list_id):
+    """Delete a prize list text file if it exists"""
+    try:
+        file_path = f"{PRIZE_LISTS_DIR}/{list_id}.txt"
+        _forget_prize_list(list_id)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    except Exception as e:
+        logger.error(f"Error deleting prize list file: {e}")
+
+async def delete_prize_list_file_async(list_id):
+    """delete_prize_list_file() run in the I/O thread pool"""
+    await run_io(delete_prize_list_file, list_id)
+
+# list ID -> (PrizeList, (mtime_ns, size) of the file it was parsed from, monotonic time of the last check)
+_prize_list_cache = LRUCache(maxsize=PRIZE_LIST_CACHE_SIZE)
+_prize_list_lock = threading.Lock()
+
+def _forget_prize_list(list_id):
+    with _prize_list_lock:
+        _prize_list_cache.pop(list_id)
+
+def _cached_prize_list(list_id):
+    """Cached parsed prize list if it was checked against its file recently enough"""
+    with _prize_list_lock:
+        cached = _prize_list_cache.get(list_id)
+    if cached is not None and time.monotonic() - cached[2] < PRIZE_LIST_CHECK_INTERVAL:
+        return cached[0]
+    return None
+
+def load_parsed_prize_list(list_id):
+    """Load and parse a prize list file, returns a PrizeList or None
+
+    Parsed lists are cached by list ID. A cached list is reused as long as
+    the file's modification time and size are unchanged; they are checked at
+    most once per PRIZE_LIST_CHECK_INTERVAL, and saving or deleting the list
+    through the bot drops it from the cache right away.
+    """
+    file_path = f"{PRIZE_LISTS_DIR}/{list_id}.txt"
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        _forget_prize_list(list_id)
+        logger.error(f"Prize list file not found: {file_path}")
+        return None
+    except Exception as e:
+        logger.error(f"Error loading prize list file: {e}")
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    
+    with _prize_list_lock:
+        cached = _prize_list_cache.get(list_id)
+        if cached is not None and cached[1] == version:
+            _prize_list_cache.put(list_id, (cached[0], version, time.monotonic()))
+            return cached[0]
+    
+    content = load_prize_list_file(list_id)
+    if content is None:
+        return None
+    prize_list = parse_prize_list(content)
+    with _prize_list_lock:
+        _prize_list_cache.put(list_id, (prize_list, version, time.monotonic()))
+    return prize_list
+
+async def load_parsed_prize_list_async(list_id):
+    """load_parsed_prize_list() that answers from memory without leaving the event loop when it can"""
+    prize_list = _cached_prize_list(list_id)
+    if prize_list is not None:
+        return prize_list
+    return await run_io(load_parsed_prize_list, list_id)
+
+_prize_snapshot_cache = LRUCache(maxsize=PRIZE_SNAPSHOT_CACHE_SIZE)
+_prize_snapshot_lock = threading.Lock()
+
+def _load_prize_snapshot_file(snapshot_key):
+    path = f"{PRIZE_SNAPSHOTS_DIR}/{snapshot_key}.json"
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+def save_prize_snapshot(snapshot):
+    """Store a prize snapshot, returns the ID (content hash) it is referenced by or None on error
+
+    Snapshots are immutable and keyed by their content, so a set of prizes
+    assigned to any number of giveaways is stored once, and storing it again
+    is a no-op.
+    """
+    key = snapshot_id(snapshot)
+    with _prize_snapshot_lock:
+        if key in _prize_snapshot_cache:
+            return key
+    ensure_data_directory()
+    try:
+        if use_sqlite():
+            get_sqlite_storage().add_document("prize_snapshots", key, snapshot)
+        else:
+            path = f"{PRIZE_SNAPSHOTS_DIR}/{key}.json"
+            if not os.path.exists(path):
+                _write_file(path, _dumps(snapshot))
+    except Exception as e:
+        # Same content under the same name: a save that got there first is just as good
+        if use_sqlite() or not os.path.exists(f"{PRIZE_SNAPSHOTS_DIR}/{key}.json"):
+            logger.error(f"Error saving prize snapshot {key}: {e}")
+            return None
+    with _prize_snapshot_lock:
+        _prize_snapshot_cache.put(key, snapshot)
+    return key
+
+async def save_prize_snapshot_async(snapshot):
+    """save_prize_snapshot() run in the I/O thread pool"""
+    return await run_io(save_prize_snapshot, snapshot)
+
+def load_prize_snapshot(key):
+    """Load a prize snapshot by ID, returns None if it is missing or does not match its hash"""
+    with _prize_snapshot_lock:
+        snapshot = _prize_snapshot_cache.get(key)
+    if snapshot is not None:
+        return snapshot
+    try:
+        if use_sqlite():
+            snapshot = get_sqlite_storage().load_document("prize_snapshots", key)
+        else:
+            snapshot = _load_prize_snapshot_file(key)
+    except Exception as e:
+        logger.error(f"Error loading prize snapshot {key}: {e}")
+        return None
+    if snapshot is None:
+        logger.error(f"Prize snapshot {key} not found")
+        return None
+    if snapshot_id(snapshot) != key:
+        logger.error(f"Prize snapshot {key} does not match its hash")
+        return None
+    with _prize_snapshot_lock:
+        _prize_snapshot_cache.put(key, snapshot)
+    return snapshot
+
+async def load_prize_snapshot_async(key):
+    """load_prize_snapshot() that answers from memory without leaving the event loop when it can"""
+    with _prize_snapshot_lock:
+        snapshot = _prize_snapshot_cache.get(key)
+    if snapshot is not None:
+        return snapshot
+    return await run_io(load_prize_snapshot, key)
+
+def migrate_inline_prizes(giveaways):
+    """Move prizes that older versions copied into each giveaway into snapshots
+
+    Assigned prizes become a prize_snapshot reference, and the copy of the
+    global prize list kept with a draw becomes a prize_snapshot reference of
+    the draw. Returns the IDs of the giveaways that changed.
+    """
+    migrated = []
+    for giveaway_id, giveaway in giveaways.items():
+        changed = False
+        if giveaway.get("assigned_prizes"):
+            key = save_prize_snapshot(prize_snapshot(
+                giveaway["assigned_prizes"], giveaway.get("prize_weights"), giveaway.get("prize_quantities")
+            ))
+            if key is None:
+                continue
+            giveaway["prize_snapshot"] = key
+        for field in ("assigned_prizes", "prize_weights", "prize_quantities"):
+            if field in giveaway:
+                del giveaway[field]
+                changed = True
+        draw = giveaway.get("draw")
+        if draw and "prizes" in draw:
+            key = save_prize_snapshot(prize_snapshot(draw["prizes"]))
+            if key is not None:
+                draw["prize_snapshot"] = key
+                del draw["prizes"]
+                changed = True
+        if changed:
+            migrated.append(giveaway_id)
+    return migrated
+
+def parse_prize_ids(prize_ids_str, prizes, index=None):
+    """Parse prize IDs, including ranges like '1-3'
+
+    Ranges are resolved through index (a PrizeIdIndex of prizes, built on
+    the fly if not given), so only the prizes that exist are visited, and
+    the missing parts of a range are reported as spans like '4-99' rather
+    than one ID at a time. Raises ValueError if more than
+    PRIZE_IDS_MAX_EXPANSION prizes would be selected.
+    """
+    if index is None:
+        index = PrizeIdIndex(prizes)
     result = {}
     missing = []
     
@@ -175,27 +1109,29 @@ def parse_prize_ids(prize_ids_str, prizes):
         if '-' in part:
             try:
                 start, end = map(str.strip, part.split('-'))
-                # Convert to int only for comparison, then back to string
                 start_int, end_int = int(start), int(end)
-                
-                # Process each ID in the range
-                for i in range(start_int, end_int + 1):
-                    prize_id = str(i)
-                    if prize_id in prizes:
-                        result[prize_id] = prizes[prize_id]
-                    else:
-                        missing.append(prize_id)
             except ValueError:
                 # If not valid integers, treat as a regular ID
-                if part in prizes:
-                    result[part] = prizes[part]
-                else:
-                    missing.append(part)
+                start_int = None
+            if start_int is not None:
+                if len(result) + index.count(start_int, end_int) > PRIZE_IDS_MAX_EXPANSION:
+                    raise ValueError(f"more than {PRIZE_IDS_MAX_EXPANSION} prizes selected")
+                found = []
+                for number in index.range(start_int, end_int):
+                    prize_id = str(number)
+                    # The index may lag behind prizes by a removal
+                    if prize_id in prizes:
+                        result[prize_id] = prizes[prize_id]
+                        found.append(number)
+                missing.extend(missing_spans(start_int, end_int, found))
+                continue
+        
+        # Regular ID
+        if part in prizes:
+            result[part] = prizes[part]
         else:
-            # Regular ID
-            if part in prizes:
-                result[part] = prizes[part]
-            else:
-                missing.append(part)
+            missing.append(part)
     
+    if len(result) > PRIZE_IDS_MAX_EXPANSION:
+        raise ValueError(f"more than {PRIZE_IDS_MAX_EXPANSION} prizes selected")
     return result, missing
@@ -0,0 +1,165 @@
+import hashlib
+import hmac
+import random
+import secrets
+from utils.participants import ParticipantRoster
+from utils.prizes import PrizePool
+
+# Upper limit for the number of winners of one giveaway
+MAX_WINNERS = 500
+
+# Prize name used when a giveaway has no prizes (or all limited ones are gone)
+DEFAULT_PRIZE = "Mystery Prize"
+
+def sample_distinct(population, k, rng=random):
+    """Pick k distinct elements of population uniformly at random, in draw order
+
+    A partial Fisher–Yates shuffle that records only the swapped positions in
+    a dict instead of copying the population, so drawing k winners from a
+    roster of any size takes O(k) time and extra memory. population only
+    needs len() and integer indexing (a list or a ParticipantRoster).
+    rng needs a randrange() method, like the random module or random.Random.
+    """
+    n = len(population)
+    k = min(k, n)
+    swapped = {}
+    picked = []
+    for i in range(k):
+        j = rng.randrange(i, n)
+        picked.append(population[swapped.get(j, j)])
+        # Position j now holds what was at position i
+        swapped[j] = swapped.get(i, i)
+    return picked
+
+def new_seed():
+    """Secret seed for a giveaway's draw, as hex"""
+    return secrets.token_hex(32)
+
+def commit_seed(seed):
+    """Commitment published while the seed is still secret: SHA-256 of the seed bytes, as hex"""
+    return hashlib.sha256(bytes.fromhex(seed)).hexdigest()
+
+class DrawRandom:
+    """Deterministic random numbers for a draw, derived from the seed with HMAC-SHA256
+
+    The stream is HMAC(seed, context || counter) for counter = 0, 1, 2...,
+    where the context binds it to the giveaway and the exact roster. It
+    offers the two methods the draw uses, randrange() (unbiased, by
+    rejection) and random(), so anyone with the seed and the roster can
+    replay the draw.
+    """
+
+    def __init__(self, seed, context):
+        self._key = bytes.fromhex(seed)
+        self._context = context
+        self._counter = 0
+        self._buffer = b""
+
+    def _read(self, size):
+        while len(self._buffer) < size:
+            block = hmac.new(self._key, self._context + self._counter.to_bytes(8, "big"), hashlib.sha256).digest()
+            self._counter += 1
+            self._buffer += block
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def getrandbits(self, bits):
+        size = (bits + 7) // 8
+        value = int.from_bytes(self._read(size), "big")
+        return value >> (size * 8 - bits)
+
+    def randrange(self, start, stop=None):
+        if stop is None:
+            start, stop = 0, start
+        width = stop - start
+        if width <= 0:
+            raise ValueError(f"empty range for randrange({start}, {stop})")
+        bits = width.bit_length()
+        while True:
+            value = self.getrandbits(bits)
+            if value < width:
+                return start + value
+
+    def random(self):
+        return self.getrandbits(53) / (1 << 53)
+
+def run_draw(giveaway_id, participants, winner_count, pool, seed, roster_hash):
+    """Draw winners and their prizes, returns [{"user": ID, "prize": name}, ...] in draw order"""
+    rng = DrawRandom(seed, f"{giveaway_id}:".encode('utf-8') + bytes.fromhex(roster_hash))
+    results = []
+    for winner_id in sample_distinct(participants, winner_count, rng):
+        drawn = pool.draw(rng)
+        results.append({"user": str(winner_id), "prize": drawn[1] if drawn else DEFAULT_PRIZE})
+    return results
+
+def num_winners(giveaway):
+    """Number of winners of a giveaway; winner_count was written by a short-lived earlier version"""
+    return giveaway.get("num_winners", giveaway.get("winner_count", 1))
+
+def draw_giveaway(giveaway_id, giveaway, snapshot_key, snapshot):
+    """Run the draw of an ending giveaway
+
+    snapshot is the prize snapshot to draw from: the one assigned to the
+    giveaway or, if there is none, one of the global prize list, whose key
+    is then kept in the draw record (None if it could not be stored). Returns the results and the draw record
+    to store with them: the revealed seed and the roster hash and size.
+    """
+    participants = giveaway["participants"]
+    draw = {
+        "seed": giveaway["draw_seed"],
+        "roster_hash": participants.digest(),
+        "participants": len(participants)
+    }
+    if snapshot_key != giveaway.get("prize_snapshot"):
+        draw["prize_snapshot"] = snapshot_key
+    results = run_draw(
+        giveaway_id,
+        participants,
+        num_winners(giveaway),
+        PrizePool.from_snapshot(snapshot),
+        draw["seed"],
+        draw["roster_hash"]
+    )
+    return results, draw
+
+def draw_snapshot_key(giveaway):
+    """Key of the prize snapshot a giveaway was (or will be) drawn from, None if the prizes are stored inline"""
+    return giveaway.get("prize_snapshot") or (giveaway.get("draw") or {}).get("prize_snapshot")
+
+def verify_draw(giveaway_id, giveaway, snapshot=None):
+    """Recompute a finished draw from its stored data, returns [(check description, passed), ...]
+
+    snapshot is the prize snapshot named by draw_snapshot_key(), if there is one.
+    """
+    draw = giveaway.get("draw")
+    if not draw:
+        return [("Данные жеребьевки сохранены", False)]
+    checks = []
+
+    commitment = giveaway.get("seed_commitment")
+    if commitment:
+        checks.append(("Сид совпадает с опубликованным хэшем", commit_seed(draw["seed"]) == commitment))
+    else:
+        checks.append(("Хэш сида был опубликован заранее", False))
+
+    participants = giveaway.get("participants")
+    if not isinstance(participants, ParticipantRoster):
+        participants = ParticipantRoster.from_stored(participants)
+    roster_hash = hashlib.sha256(participants.to_bytes()).hexdigest()
+    checks.append((
+        "Список участников не изменился после розыгрыша",
+        roster_hash == draw["roster_hash"] and len(participants) == draw["participants"]
+    ))
+
+    if draw_snapshot_key(giveaway):
+        # load_prize_snapshot() only returns snapshots that match their hash
+        checks.append(("Снимок списка призов найден и не изменился", snapshot is not None))
+        pool = PrizePool.from_snapshot(snapshot) if snapshot is not None else PrizePool({})
+    else:
+        # Drawn by an older version that copied the prizes into the giveaway or the draw
+        pool = PrizePool.for_giveaway(giveaway, draw.get("prizes"))
+    results = run_draw(
+        giveaway_id, participants, num_winners(giveaway), pool, draw["seed"], draw["roster_hash"]
+    )
+    checks.append(("Победители и призы совпадают с пересчетом", results == giveaway.get("winners", [])))
+    return checks
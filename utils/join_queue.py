@@ -0,0 +1,109 @@
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Join requests waiting to be applied; clicks beyond this are turned away
+JOIN_QUEUE_SIZE = int(os.getenv("JOIN_QUEUE_SIZE", "5000"))
+# Maximum number of join requests applied in one batch
+JOIN_BATCH_SIZE = int(os.getenv("JOIN_BATCH_SIZE", "500"))
+
+class JoinQueue:
+    """Collects join requests and hands them to apply_batch in batches
+
+    apply_batch(giveaway_id, user_ids) is called once per giveaway per batch,
+    so a burst of clicks costs one journal write per giveaway rather than one
+    per click. Requests already waiting in the queue are remembered per
+    giveaway, which lets the join handler answer duplicate clicks and check
+    whether a user is in without waiting for the batch.
+    """
+
+    def __init__(self, apply_batch, maxsize=JOIN_QUEUE_SIZE, batch_size=JOIN_BATCH_SIZE):
+        self._apply_batch = apply_batch
+        self.batch_size = batch_size
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        # giveaway ID -> user IDs waiting in the queue
+        self._pending = {}
+        self._applied = asyncio.Condition()
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def is_pending(self, giveaway_id, user_id):
+        return user_id in self._pending.get(giveaway_id, ())
+
+    def submit(self, giveaway_id, user_id):
+        """Queue a join request, returns False if the queue is full"""
+        try:
+            self._queue.put_nowait((giveaway_id, user_id))
+        except asyncio.QueueFull:
+            return False
+        self._pending.setdefault(giveaway_id, set()).add(user_id)
+        return True
+
+    async def drain(self, giveaway_id, timeout=10.0):
+        """Wait until every queued request for a giveaway has been applied"""
+        try:
+            async with self._applied:
+                await asyncio.wait_for(
+                    self._applied.wait_for(lambda: giveaway_id not in self._pending),
+                    timeout
+                )
+        except asyncio.TimeoutError:
+            logger.warning(f"Join requests for giveaway {giveaway_id} were not applied within {timeout} seconds")
+
+    async def flush(self):
+        """Apply everything that is queued right away"""
+        while not self._queue.empty():
+            await self._apply(self._take_batch([]))
+
+    async def close(self):
+        """Stop the worker and apply whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def _take_batch(self, batch):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _apply(self, batch):
+        by_giveaway = {}
+        for giveaway_id, user_id in batch:
+            by_giveaway.setdefault(giveaway_id, []).append(user_id)
+        for giveaway_id, user_ids in by_giveaway.items():
+            try:
+                self._apply_batch(giveaway_id, user_ids)
+            except Exception as e:
+                logger.error(f"Error applying {len(user_ids)} join(s) to giveaway {giveaway_id}: {e}")
+            pending = self._pending.get(giveaway_id)
+            if pending is not None:
+                pending.difference_update(user_ids)
+                if not pending:
+                    del self._pending[giveaway_id]
+        for _ in batch:
+            self._queue.task_done()
+        async with self._applied:
+            self._applied.notify_all()
+
+    async def _run(self):
+        while True:
+            try:
+                batch = [await self._queue.get()]
+                await self._apply(self._take_batch(batch))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in join queue worker: {e}")
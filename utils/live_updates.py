@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two edits of the same live counter, and how far it may back off
+LIVE_COUNTER_INTERVAL = float(os.getenv("LIVE_COUNTER_INTERVAL", "5"))
+LIVE_COUNTER_MAX_INTERVAL = float(os.getenv("LIVE_COUNTER_MAX_INTERVAL", "60"))
+
+# An update taking longer than this most likely waited out a rate limit inside discord.py
+SLOW_UPDATE_SECONDS = 1.0
+
+class CoalescingUpdater:
+    """Runs update(key) at most once per interval for each key, however often it is requested
+
+    Requests that come in while an update is pending or cooling down are
+    folded into the next one, which reads the current state when it runs.
+    The interval of a key doubles (up to max_interval) whenever its update
+    hits a 429 or is slowed down by discord.py waiting out a rate limit, and
+    shrinks back towards the base interval after updates that went through
+    quickly.
+    """
+
+    def __init__(self, update, interval=LIVE_COUNTER_INTERVAL, max_interval=LIVE_COUNTER_MAX_INTERVAL):
+        self._update = update
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self._dirty = set()
+        self._tasks = {}
+        self._last_run = {}
+        self._intervals = {}
+
+    def request(self, key):
+        """Ask for an update of key"""
+        self._dirty.add(key)
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._run(key))
+
+    def interval_for(self, key):
+        return self._intervals.get(key, self.interval)
+
+    def discard(self, key):
+        """Drop pending updates of key and forget its state"""
+        self._dirty.discard(key)
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+        self._last_run.pop(key, None)
+        self._intervals.pop(key, None)
+
+    async def close(self):
+        for key in list(self._tasks):
+            self.discard(key)
+
+    async def _run(self, key):
+        try:
+            while key in self._dirty:
+                interval = self.interval_for(key)
+                last_run = self._last_run.get(key)
+                if last_run is not None:
+                    delay = last_run + interval - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                self._dirty.discard(key)
+
+                started = time.monotonic()
+                rate_limited = False
+                try:
+                    await self._update(key)
+                    rate_limited = time.monotonic() - started > SLOW_UPDATE_SECONDS
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    rate_limited = getattr(e, "status", None) == 429
+                    if rate_limited:
+                        # Nothing was shown, try again after backing off
+                        self._dirty.add(key)
+                    else:
+                        logger.error(f"Error updating {key}: {e}")
+                self._last_run[key] = time.monotonic()
+
+                if rate_limited:
+                    interval = min(self.max_interval, interval * 2)
+                    logger.warning(f"Updates of {key} are rate limited, next one in {interval:.0f} seconds")
+                else:
+                    interval = max(self.interval, interval * 0.75)
+                self._intervals[key] = interval
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
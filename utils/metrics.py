@@ -0,0 +1,51 @@
+import bisect
+import math
+
+class LatencyHistogram:
+    """Fixed-size histogram of latencies (in seconds) with approximate percentiles
+
+    Samples are counted in geometric buckets, each 20% wider than the one
+    before, from min_latency up to max_latency, so recording is O(1), memory
+    does not grow with the number of samples and every percentile is accurate
+    to within one bucket (20%).
+    """
+
+    def __init__(self, min_latency=0.0001, max_latency=60.0, growth=1.2):
+        bucket_count = math.ceil(math.log(max_latency / min_latency, growth)) + 1
+        # Upper bound of each bucket; samples above the last bound go into an overflow bucket
+        self.bounds = [min_latency * growth ** i for i in range(bucket_count)]
+        self.counts = [0] * (bucket_count + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency):
+        self.counts[bisect.bisect_left(self.bounds, latency)] += 1
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile, None without samples"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                if index == len(self.bounds):
+                    return self.max
+                return min(self.bounds[index], self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
@@ -0,0 +1,72 @@
+import discord
+
+# How long (seconds) the page buttons keep working
+PAGINATOR_TIMEOUT = 600
+
+def clip(text, limit):
+    """Cut text to at most limit characters, marking the cut with an ellipsis"""
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+class Paginator(discord.ui.View):
+    """Shows a long list as an embed one page at a time, with ◀ / ▶ buttons
+
+    items is the index of the list, computed once when the command runs:
+    any sequence that supports len() and slicing, usually a list of keys.
+    render_page(page_items, start) builds the embed for one slice of it and
+    is only called for the page being shown, so nothing is rendered (or
+    fetched) for pages nobody opens; it may be a coroutine. Pages are
+    slices of that fixed index, so the cursor stays on the same items even
+    if the underlying data changes while someone is paging.
+    """
+
+    def __init__(self, items, render_page, per_page=20, timeout=PAGINATOR_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.items = items
+        self.render_page = render_page
+        self.per_page = per_page
+        self.page = 0
+
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.items) // self.per_page))
+
+    async def render(self):
+        """Embed of the current page, with the page number in the footer"""
+        self.page = max(0, min(self.page, self.page_count - 1))
+        start = self.page * self.per_page
+        embed = await discord.utils.maybe_coroutine(self.render_page, self.items[start:start + self.per_page], start)
+        if self.page_count > 1:
+            footer = f"Страница {self.page + 1}/{self.page_count}"
+            if embed.footer.text:
+                footer = f"{embed.footer.text} • {footer}"
+            embed.set_footer(text=footer)
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+        return embed
+
+    async def send(self, interaction, ephemeral=True, **kwargs):
+        """Send the first page as the reply to interaction (or as a follow-up if it was deferred)"""
+        embed = await self.render()
+        if self.page_count > 1:
+            kwargs["view"] = self
+        else:
+            self.stop()
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed, ephemeral=ephemeral, **kwargs)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=ephemeral, **kwargs)
+
+    async def show_page(self, interaction, page):
+        self.page = page
+        # Rendering may fetch data and take longer than Discord waits for a reply
+        await interaction.response.defer()
+        await interaction.edit_original_response(embed=await self.render(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page + 1)
@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import sys
+from array import array
+
+# Rosters with at least this many participants are stored as packed
+# little-endian uint64 snowflakes instead of a list of ID strings
+COMPACT_THRESHOLD = 100
+
+class ParticipantRoster:
+    """Participants of a giveaway in join order with constant-time membership checks
+
+    User IDs (Discord snowflakes) are packed into an array('Q') in join order,
+    8 bytes each, which is what draws read. The set used for duplicate
+    detection is only built once something checks membership, and can be
+    dropped again with release_index() when the giveaway ends, so finished
+    giveaways cost 8 bytes per participant.
+
+    digest() is a SHA-256 of the roster in join order (see to_bytes);
+    once a roster accepts joins the hash is kept up to date with every join,
+    so it is ready without rehashing the whole roster when the draw runs.
+    """
+
+    __slots__ = ("_order", "_members", "_hasher")
+
+    def __init__(self, user_ids=()):
+        self._order = array('Q', (int(user_id) for user_id in user_ids))
+        self._members = None
+        self._hasher = None
+
+    @classmethod
+    def from_stored(cls, value):
+        """Build a roster from its stored form (see to_stored)"""
+        if isinstance(value, dict):
+            roster = cls()
+            data = array('Q', base64.b64decode(value["u64le"]))
+            if sys.byteorder != "little":
+                data.byteswap()
+            roster._order = data
+            return roster
+        return cls(value or [])
+
+    def to_stored(self):
+        """Stored form of the roster: a list of ID strings, or packed snowflakes for large rosters"""
+        if len(self._order) < COMPACT_THRESHOLD:
+            return [str(user_id) for user_id in self._order]
+        return {"u64le": base64.b64encode(self.to_bytes()).decode('ascii')}
+
+    def to_bytes(self):
+        """Participants in join order as packed little-endian uint64"""
+        data = self._order
+        if sys.byteorder != "little":
+            data = array('Q', data)
+            data.byteswap()
+        return data.tobytes()
+
+    def digest(self):
+        """Hex SHA-256 of to_bytes(), kept up to date incrementally"""
+        if self._hasher is None:
+            self._hasher = hashlib.sha256(self.to_bytes())
+        return self._hasher.hexdigest()
+
+    def _index(self):
+        if self._members is None:
+            self._members = set(self._order)
+        return self._members
+
+    def release_index(self):
+        """Drop the membership set, e.g. once the giveaway no longer accepts joins"""
+        self._members = None
+
+    def add(self, user_id):
+        """Add a participant, returns False if they were already in"""
+        user_id = int(user_id)
+        members = self._index()
+        if user_id in members:
+            return False
+        members.add(user_id)
+        if self._hasher is None:
+            # One full pass the first time, every later join only hashes its own 8 bytes
+            self._hasher = hashlib.sha256(self.to_bytes())
+        self._order.append(user_id)
+        self._hasher.update(user_id.to_bytes(8, "little"))
+        return True
+
+    def discard(self, user_id):
+        """Remove a participant, returns False if they were not in"""
+        user_id = int(user_id)
+        members = self._index()
+        if user_id not in members:
+            return False
+        members.remove(user_id)
+        self._order.remove(user_id)
+        # A removal can't be hashed incrementally, the next digest() starts over
+        self._hasher = None
+        return True
+
+    def to_list(self):
+        """Participants as a list of ID strings"""
+        return [str(user_id) for user_id in self._order]
+
+    def __contains__(self, user_id):
+        try:
+            return int(user_id) in self._index()
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __getitem__(self, index):
+        return self._order[index]
+
+    def __repr__(self):
+        return f"ParticipantRoster({len(self)} participants)"
+
+def _benchmark(count=100_000):
+    """Compare memory and on-disk size per participant for the old and new representations"""
+    import json
+    import random
+    import tracemalloc
+
+    snowflakes = [random.getrandbits(60) | (1 << 59) for _ in range(count)]
+
+    def measure(build):
+        tracemalloc.start()
+        value = build()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return value, size
+
+    _, legacy = measure(lambda: [str(user_id) for user_id in snowflakes])
+
+    def active_roster():
+        roster = ParticipantRoster()
+        for user_id in snowflakes:
+            roster.add(user_id)
+        return roster
+    roster, active = measure(active_roster)
+
+    def ended_roster():
+        roster = ParticipantRoster(snowflakes)
+        roster.release_index()
+        return roster
+    _, ended = measure(ended_roster)
+
+    legacy_disk = len(json.dumps([str(user_id) for user_id in snowflakes], indent=4))
+    compact_disk = len(json.dumps(roster.to_stored()))
+
+    print(f"Participants: {count}")
+    print(f"list of str (legacy):           {legacy / count:6.1f} bytes/participant in memory")
+    print(f"roster, accepting joins:        {active / count:6.1f} bytes/participant in memory")
+    print(f"roster, ended (index released): {ended / count:6.1f} bytes/participant in memory")
+    print(f"JSON list, indent=4 (legacy):   {legacy_disk / count:6.1f} bytes/participant on disk")
+    print(f"packed u64 + base64:            {compact_disk / count:6.1f} bytes/participant on disk")
+
+if __name__ == "__main__":
+    _benchmark()
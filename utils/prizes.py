@@ -0,0 +1,380 @@
+import bisect
+import codecs
+import hashlib
+import json
+import os
+import random
+from utils.cache import LRUCache
+
+# Limits for uploaded prize list files: size in bytes and number of prizes
+PRIZE_LIST_MAX_BYTES = int(os.getenv("PRIZE_LIST_MAX_BYTES", str(16 * 1024 * 1024)))
+PRIZE_LIST_MAX_ROWS = int(os.getenv("PRIZE_LIST_MAX_ROWS", "200000"))
+# Longer lines are rejected as invalid without being buffered in full
+PRIZE_LINE_MAX_LENGTH = 1024
+
+class PrizeEntry:
+    """One line of a prize list: `ID:Name`, optionally followed by `| weight | quantity`"""
+
+    __slots__ = ("prize_id", "name", "weight", "quantity")
+
+    def __init__(self, prize_id, name, weight=1.0, quantity=None):
+        self.prize_id = prize_id
+        self.name = name
+        self.weight = weight
+        # None means unlimited
+        self.quantity = quantity
+
+    def __repr__(self):
+        return f"PrizeEntry({self.prize_id!r}, {self.name!r}, {self.weight!r}, {self.quantity!r})"
+
+def parse_prize_line(line):
+    """Parse a prize list line, returns a PrizeEntry or None if the line is invalid
+
+    Weight is relative (default 1), quantity is how many of the prize can be
+    won in one draw; leave it out or use "-" for unlimited:
+
+        1:Скотч
+        2:MC 500 | 0.5 | 1
+    """
+    if ':' not in line:
+        return None
+    prize_id, rest = line.split(':', 1)
+    name, *columns = [part.strip() for part in rest.split('|')]
+    prize_id = prize_id.strip()
+    if not prize_id or not name or len(columns) > 2:
+        return None
+    weight = 1.0
+    quantity = None
+    try:
+        if columns and columns[0]:
+            weight = float(columns[0])
+        if len(columns) > 1 and columns[1] not in ("", "-"):
+            quantity = int(columns[1])
+    except ValueError:
+        return None
+    if not weight > 0 or weight == float("inf") or (quantity is not None and quantity < 0):
+        return None
+    return PrizeEntry(prize_id, name, weight, quantity)
+
+class PrizeList:
+    """Parsed prize list file: entries by prize ID in file order, plus the lines that could not be parsed"""
+
+    __slots__ = ("entries", "invalid_lines")
+
+    def __init__(self, entries, invalid_lines):
+        self.entries = entries
+        # (line number, line) pairs
+        self.invalid_lines = invalid_lines
+
+    @property
+    def prizes(self):
+        """Prize ID -> name"""
+        return {prize_id: entry.name for prize_id, entry in self.entries.items()}
+
+    @property
+    def weights(self):
+        """Prize ID -> weight, for prizes whose weight is not the default"""
+        return {prize_id: entry.weight for prize_id, entry in self.entries.items() if entry.weight != 1}
+
+    @property
+    def quantities(self):
+        """Prize ID -> quantity, for limited prizes"""
+        return {prize_id: entry.quantity for prize_id, entry in self.entries.items() if entry.quantity is not None}
+
+    def __len__(self):
+        return len(self.entries)
+
+def parse_prize_list(text):
+    """Parse the contents of a prize list file, skipping empty lines and # comments"""
+    entries = {}
+    invalid_lines = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        entry = parse_prize_line(line)
+        if entry:
+            entries[entry.prize_id] = entry
+        else:
+            invalid_lines.append((line_number, line))
+    return PrizeList(entries, invalid_lines)
+
+class PrizeListTooLarge(ValueError):
+    """An uploaded prize list is over PRIZE_LIST_MAX_BYTES or PRIZE_LIST_MAX_ROWS"""
+
+class PrizeListReader:
+    """Parses an uploaded prize list as it arrives, chunk by chunk
+
+    feed() takes raw bytes and returns the valid lines seen so far,
+    normalized (no BOM, LF line endings, surrounding whitespace stripped),
+    ready to be written to the list's file; close() flushes the last line.
+    Only the current line, the set of prize IDs and a few sample lines for
+    the preview are kept, so memory does not grow with the size of the file.
+    Lines that are not valid UTF-8 are skipped as invalid on their own.
+    """
+
+    def __init__(self, max_bytes=PRIZE_LIST_MAX_BYTES, max_rows=PRIZE_LIST_MAX_ROWS, preview_size=10, invalid_sample_size=5):
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.preview_size = preview_size
+        self.invalid_sample_size = invalid_sample_size
+        self.size = 0
+        self.line_number = 0
+        self.rows = 0
+        self.prize_ids = set()
+        # First valid entries, and (line number, line) of the first invalid lines
+        self.preview = []
+        self.invalid_lines = []
+        self.invalid_count = 0
+        self._line = bytearray()
+        self._overlong = False
+
+    @property
+    def prize_count(self):
+        """Number of distinct prize IDs; a repeated ID replaces the earlier line"""
+        return len(self.prize_ids)
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise PrizeListTooLarge(f"file is larger than {self.max_bytes} bytes")
+        out = bytearray()
+        pieces = chunk.split(b"\n")
+        for piece in pieces[:-1]:
+            self._append(piece)
+            self._end_line(out)
+        self._append(pieces[-1])
+        return bytes(out)
+
+    def close(self):
+        out = bytearray()
+        if self._line or self._overlong:
+            self._end_line(out)
+        return bytes(out)
+
+    def _append(self, piece):
+        room = PRIZE_LINE_MAX_LENGTH - len(self._line)
+        if len(piece) > room:
+            piece = piece[:max(room, 0)]
+            self._overlong = True
+        self._line += piece
+
+    def _end_line(self, out):
+        raw = bytes(self._line)
+        overlong = self._overlong
+        self._line.clear()
+        self._overlong = False
+        self.line_number += 1
+        if self.line_number == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            line = raw.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            line = None
+        if line is not None and not overlong and (not line or line.startswith('#')):
+            return
+        entry = parse_prize_line(line) if line is not None and not overlong else None
+        if entry is None:
+            self.invalid_count += 1
+            if len(self.invalid_lines) < self.invalid_sample_size:
+                text = raw.decode('utf-8', errors='replace').strip()
+                self.invalid_lines.append((self.line_number, text + "…" if overlong else text))
+            return
+        self.rows += 1
+        if self.rows > self.max_rows:
+            raise PrizeListTooLarge(f"file has more than {self.max_rows} prizes")
+        self.prize_ids.add(entry.prize_id)
+        if len(self.preview) < self.preview_size:
+            self.preview.append(entry)
+        out += line.encode('utf-8') + b"\n"
+
+def format_prize_entry(entry):
+    """Prize name with its weight and quantity, if they are set"""
+    text = entry.name
+    details = []
+    if entry.weight != 1:
+        details.append(f"вес {entry.weight:g}")
+    if entry.quantity is not None:
+        details.append(f"{entry.quantity} шт.")
+    if details:
+        text += f" ({', '.join(details)})"
+    return text
+
+def prize_number(prize_id):
+    """Integer value of a numeric prize ID like "42", None for other IDs (including "042")"""
+    if not prize_id.isdigit():
+        return None
+    number = int(prize_id)
+    return number if str(number) == prize_id else None
+
+def format_id_span(start, end):
+    return str(start) if start == end else f"{start}-{end}"
+
+class PrizeIdIndex:
+    """Sorted numeric prize IDs, so a range like 1-100000 is resolved with two bisections
+
+    range() costs O(log n + k) for k prizes in the range, however wide the
+    range is. IDs that are not plain numbers are not indexed; they can only
+    be referred to one by one.
+    """
+
+    def __init__(self, prize_ids=()):
+        self._numbers = sorted(number for number in map(prize_number, prize_ids) if number is not None)
+
+    def add(self, prize_id):
+        number = prize_number(prize_id)
+        if number is None:
+            return
+        i = bisect.bisect_left(self._numbers, number)
+        if i == len(self._numbers) or self._numbers[i] != number:
+            self._numbers.insert(i, number)
+
+    def discard(self, prize_id):
+        number = prize_number(prize_id)
+        if number is None:
+            return
+        i = bisect.bisect_left(self._numbers, number)
+        if i < len(self._numbers) and self._numbers[i] == number:
+            del self._numbers[i]
+
+    def count(self, start, end):
+        """Number of indexed IDs from start to end inclusive"""
+        return max(0, bisect.bisect_right(self._numbers, end) - bisect.bisect_left(self._numbers, start))
+
+    def range(self, start, end):
+        """Indexed IDs from start to end inclusive, as numbers in ascending order"""
+        return self._numbers[bisect.bisect_left(self._numbers, start):bisect.bisect_right(self._numbers, end)]
+
+    def __len__(self):
+        return len(self._numbers)
+
+def missing_spans(start, end, found):
+    """The parts of start..end not covered by found (ascending numbers within it), as "a-b" / "a" strings"""
+    spans = []
+    expected = start
+    for number in found:
+        if number > expected:
+            spans.append(format_id_span(expected, number - 1))
+        expected = number + 1
+    if expected <= end:
+        spans.append(format_id_span(expected, end))
+    return spans
+
+def prize_snapshot(prizes, weights=None, quantities=None):
+    """Immutable stored form of a set of prizes: entries [ID, name, weight, quantity] in draw order"""
+    weights = weights or {}
+    quantities = quantities or {}
+    return {"entries": [
+        [prize_id, name, float(weights.get(prize_id, 1.0)), quantities.get(prize_id)]
+        for prize_id, name in prizes.items()
+    ]}
+
+def snapshot_id(snapshot):
+    """Content hash a prize snapshot is stored and referenced under"""
+    payload = json.dumps(snapshot["entries"], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class AliasTable:
+    """Walker's alias method: O(n) setup, then O(1) per weighted draw
+
+    Every slot holds its own outcome with probability prob[i] and its alias
+    otherwise, so a draw is one randrange() and one random() call.
+    """
+
+    __slots__ = ("prob", "alias")
+
+    def __init__(self, weights):
+        n = len(weights)
+        if n == 0:
+            raise ValueError("AliasTable needs at least one weight")
+        total = float(sum(weights))
+        scaled = [weight * n / total for weight in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left is 1 up to rounding errors
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        """Index of the drawn outcome; rng needs randrange() and random()"""
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+# Alias tables of recently used prize sets, shared by every giveaway that uses the same set
+_alias_tables = LRUCache(maxsize=64)
+
+def prize_set_hash(prize_ids, weights):
+    """Key identifying a set of prizes with their weights"""
+    payload = json.dumps([[prize_id, weights.get(prize_id, 1.0)] for prize_id in prize_ids], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def _alias_table(prize_ids, weights):
+    key = prize_set_hash(prize_ids, weights)
+    table = _alias_tables.get(key)
+    if table is None:
+        table = AliasTable([weights.get(prize_id, 1.0) for prize_id in prize_ids])
+        _alias_tables.put(key, table)
+    return table
+
+class PrizePool:
+    """Weighted prizes with limited stock for one draw
+
+    draw() is O(1) while every prize is in stock. When a limited prize runs
+    out the alias table is rebuilt without it, which happens at most once
+    per limited prize.
+    """
+
+    def __init__(self, prizes, weights=None, quantities=None):
+        self.prizes = dict(prizes)
+        self.weights = dict(weights or {})
+        # Remaining stock of the limited prizes
+        self.stock = {
+            prize_id: quantity for prize_id, quantity in (quantities or {}).items()
+            if prize_id in self.prizes and quantity is not None
+        }
+        self._ids = [prize_id for prize_id in self.prizes if self.stock.get(prize_id, 1) > 0]
+        self._table = _alias_table(self._ids, self.weights) if self._ids else None
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Pool of the prizes in a prize snapshot"""
+        prizes = {}
+        weights = {}
+        quantities = {}
+        for prize_id, name, weight, quantity in snapshot["entries"]:
+            prizes[prize_id] = name
+            weights[prize_id] = weight
+            if quantity is not None:
+                quantities[prize_id] = quantity
+        return cls(prizes, weights, quantities)
+
+    @classmethod
+    def for_giveaway(cls, giveaway, fallback_prizes=None):
+        """Pool of the prizes older versions copied into the giveaway, or of fallback_prizes (uniform) if there are none"""
+        if giveaway.get("assigned_prizes"):
+            return cls(giveaway["assigned_prizes"], giveaway.get("prize_weights"), giveaway.get("prize_quantities"))
+        return cls(fallback_prizes or {})
+
+    def draw(self, rng=random):
+        """Draw a prize, returns (prize_id, name) or None once everything is given away"""
+        if self._table is None:
+            return None
+        prize_id = self._ids[self._table.sample(rng)]
+        if prize_id in self.stock:
+            self.stock[prize_id] -= 1
+            if self.stock[prize_id] <= 0:
+                self._ids.remove(prize_id)
+                self._table = _alias_table(self._ids, self.weights) if self._ids else None
+        return prize_id, self.prizes[prize_id]
@@ -0,0 +1,48 @@
+import os
+import time
+from collections import OrderedDict
+
+# Join clicks allowed per user: JOIN_CLICK_BURST at once, refilled at JOIN_CLICK_RATE per second
+JOIN_CLICK_RATE = float(os.getenv("JOIN_CLICK_RATE", "0.5"))
+JOIN_CLICK_BURST = float(os.getenv("JOIN_CLICK_BURST", "3"))
+# Count clicks per user and giveaway instead of per user across all giveaways
+JOIN_CLICK_PER_GIVEAWAY = os.getenv("JOIN_CLICK_PER_GIVEAWAY", "false").lower() == "true"
+# Number of buckets kept; the least recently used one is dropped beyond that
+JOIN_CLICK_MAX_TRACKED = int(os.getenv("JOIN_CLICK_MAX_TRACKED", "10000"))
+
+class TokenBucketLimiter:
+    """Token bucket per key with a bounded number of buckets
+
+    Every key may do `burst` actions at once and gets `rate` tokens back per
+    second. Buckets live in an OrderedDict in least recently used order, so
+    a check is O(1) and memory stays bounded: once max_keys is reached the
+    bucket idle for the longest time is dropped. A dropped bucket would have
+    refilled by then anyway unless the limit is set very tight.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, monotonic time of the last update]
+        self._buckets = OrderedDict()
+
+    def allow(self, key):
+        """Take a token for key, returns False if its bucket is empty"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def __len__(self):
+        return len(self._buckets)
@@ -0,0 +1,112 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+class DeadlineScheduler:
+    """Runs an async callback for each key once its wall-clock deadline passes
+
+    All deadlines live in one min-heap served by a single task that sleeps
+    until the earliest one, so thousands of pending giveaways cost one task
+    instead of one sleeping task each. Rescheduling pushes a new heap entry
+    and cancelling just forgets the key; outdated heap entries are skipped
+    when they reach the top, which keeps both O(log n).
+
+    Deadlines are Unix timestamps, the same values stored as end_time, and
+    sleeps are capped at max_sleep so a change of the system clock is picked
+    up within that time.
+    """
+
+    def __init__(self, callback, max_sleep=60.0):
+        self._callback = callback
+        self.max_sleep = max_sleep
+        # (deadline, sequence, key); the sequence number identifies the current entry of a key
+        self._heap = []
+        self._entries = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._running = set()
+
+    def schedule(self, key, deadline):
+        """Run the callback for key at deadline, replacing any earlier schedule for it"""
+        sequence = next(self._sequence)
+        self._entries[key] = (deadline, sequence)
+        heapq.heappush(self._heap, (deadline, sequence, key))
+        if self._heap[0][1] == sequence:
+            # New earliest deadline, the loop has to shorten its sleep
+            self._wakeup.set()
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+
+    def cancel(self, key):
+        """Forget the deadline of key, returns False if none was scheduled"""
+        return self._entries.pop(key, None) is not None
+
+    def deadline(self, key):
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _compact(self):
+        """Rebuild the heap without the entries left behind by reschedules and cancels"""
+        self._heap = [(deadline, sequence, key) for key, (deadline, sequence) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def _is_current(self, item):
+        deadline, sequence, key = item
+        return self._entries.get(key) == (deadline, sequence)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the scheduler loop; callbacks that already started keep running"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and (self._heap[0][0] <= now or not self._is_current(self._heap[0])):
+                item = heapq.heappop(self._heap)
+                if not self._is_current(item):
+                    continue
+                del self._entries[item[2]]
+                self._fire(item[2])
+
+            timeout = self.max_sleep
+            if self._heap:
+                timeout = min(timeout, self._heap[0][0] - now)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, key):
+        task = asyncio.create_task(self._callback(key))
+        self._running.add(task)
+        task.add_done_callback(self._callback_done)
+
+    def _callback_done(self, task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            logger.error(f"Error in scheduled callback: {error}")
+            logger.error("".join(traceback.format_exception(error)))
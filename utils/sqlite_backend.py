@@ -0,0 +1,315 @@
+import concurrent.futures
+import json
+import sqlite3
+import threading
+import logging
+from utils.participants import ParticipantRoster
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS giveaways (
+    id TEXT PRIMARY KEY,
+    guild_id TEXT,
+    ended INTEGER NOT NULL DEFAULT 0,
+    end_time REAL,
+    archived INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_giveaways_guild_id ON giveaways (guild_id);
+CREATE INDEX IF NOT EXISTS idx_giveaways_ended_end_time ON giveaways (ended, end_time);
+
+-- rowid order is join order, which keeps draws reproducible
+CREATE TABLE IF NOT EXISTS participants (
+    giveaway_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    PRIMARY KEY (giveaway_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS prizes (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS gifs (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS prize_lists (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+-- Immutable, keyed by content hash
+CREATE TABLE IF NOT EXISTS prize_snapshots (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Simple id -> JSON value collections
+DOCUMENT_TABLES = ("prizes", "gifs", "prize_lists", "prize_snapshots")
+
+def _encode(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+class SqliteStorage:
+    """SQLite storage for giveaways, prizes, GIFs and prize lists
+
+    Giveaway metadata lives in one row per giveaway and every participant in
+    its own row, so recording a join is a single-row insert.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade_schema()
+
+    def _upgrade_schema(self):
+        """Add columns introduced after the database was created"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(giveaways)")}
+        if "archived" not in columns:
+            self._conn.execute("ALTER TABLE giveaways ADD COLUMN archived INTEGER NOT NULL DEFAULT 0")
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def load_giveaways(self):
+        """Load every giveaway that is not archived, with its participants"""
+        with self._lock:
+            giveaways = {
+                giveaway_id: json.loads(data)
+                for giveaway_id, data in self._conn.execute("SELECT id, data FROM giveaways WHERE archived = 0")
+            }
+            for giveaway in giveaways.values():
+                giveaway["participants"] = []
+            rows = self._conn.execute(
+                "SELECT p.giveaway_id, p.user_id FROM participants p "
+                "JOIN giveaways g ON g.id = p.giveaway_id WHERE g.archived = 0 ORDER BY p.rowid"
+            )
+            for giveaway_id, user_id in rows:
+                if giveaway_id in giveaways:
+                    giveaways[giveaway_id]["participants"].append(user_id)
+        return giveaways
+
+    def load_giveaway(self, giveaway_id):
+        """Load a single giveaway (archived or not) with its participants"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM giveaways WHERE id = ?", (giveaway_id,)).fetchone()
+            if row is None:
+                return None
+            giveaway = json.loads(row[0])
+            giveaway["participants"] = [
+                user_id for (user_id,) in self._conn.execute(
+                    "SELECT user_id FROM participants WHERE giveaway_id = ? ORDER BY rowid", (giveaway_id,)
+                )
+            ]
+        return giveaway
+
+    def archive_giveaways(self, giveaway_ids):
+        """Flag giveaways as archived so they are no longer loaded on startup"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE giveaways SET archived = 1 WHERE id = ?",
+                    ((giveaway_id,) for giveaway_id in giveaway_ids)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def save_giveaways(self, giveaways, giveaway_ids=None, with_participants=False):
+        """Upsert giveaway rows
+
+        Participants are normally written one row at a time by apply_event(),
+        so only the metadata of the given giveaways is rewritten here unless
+        with_participants is set.
+        """
+        ids = giveaways.keys() if giveaway_ids is None else giveaway_ids
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for giveaway_id in ids:
+                    giveaway = giveaways.get(giveaway_id)
+                    if giveaway is None:
+                        continue
+                    self._upsert_giveaway(giveaway_id, giveaway)
+                    if with_participants:
+                        participants = giveaway.get("participants", [])
+                        if isinstance(participants, dict):
+                            # Packed stored form of a large roster
+                            participants = ParticipantRoster.from_stored(participants)
+                        self._conn.execute("DELETE FROM participants WHERE giveaway_id = ?", (giveaway_id,))
+                        self._conn.executemany(
+                            "INSERT OR IGNORE INTO participants (giveaway_id, user_id) VALUES (?, ?)",
+                            ((giveaway_id, str(user_id)) for user_id in participants)
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _upsert_giveaway(self, giveaway_id, giveaway):
+        data = {key: value for key, value in giveaway.items() if key != "participants"}
+        self._conn.execute(
+            "INSERT INTO giveaways (id, guild_id, ended, end_time, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET guild_id = excluded.guild_id, ended = excluded.ended, "
+            "end_time = excluded.end_time, data = excluded.data",
+            (
+                giveaway_id,
+                giveaway.get("guild_id"),
+                1 if giveaway.get("ended", False) else 0,
+                giveaway.get("end_time"),
+                _encode(data)
+            )
+        )
+
+    def apply_event(self, op, giveaway_id, data):
+        """Apply a single giveaway change as row-level writes"""
+        with self._lock:
+            self._apply_event(op, giveaway_id, data)
+
+    def apply_events(self, op, giveaway_id, records):
+        """Apply several changes of the same kind in one transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for data in records:
+                    self._apply_event(op, giveaway_id, data)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _apply_event(self, op, giveaway_id, data):
+        if op == "create":
+            self._upsert_giveaway(giveaway_id, data["giveaway"])
+        elif op == "join":
+            self._conn.execute(
+                "INSERT OR IGNORE INTO participants (giveaway_id, user_id) VALUES (?, ?)",
+                (giveaway_id, str(data["user"]))
+            )
+        elif op == "leave":
+            self._conn.execute(
+                "DELETE FROM participants WHERE giveaway_id = ? AND user_id = ?",
+                (giveaway_id, str(data["user"]))
+            )
+        elif op in ("end", "cancel"):
+            fields = {"ended": True}
+            if "ended_at" in data:
+                fields["ended_at"] = data["ended_at"]
+            self._update_fields(giveaway_id, fields)
+        elif op in ("assign", "update"):
+            self._update_fields(giveaway_id, data["fields"])
+        else:
+            logger.warning(f"Unknown giveaway operation: {op}")
+
+    def _update_fields(self, giveaway_id, fields):
+        row = self._conn.execute("SELECT data FROM giveaways WHERE id = ?", (giveaway_id,)).fetchone()
+        if row is None:
+            logger.warning(f"Giveaway {giveaway_id} not found in SQLite storage")
+            return
+        data = json.loads(row[0])
+        data.update(fields)
+        self._conn.execute(
+            "UPDATE giveaways SET ended = ?, end_time = ?, data = ? WHERE id = ?",
+            (1 if data.get("ended", False) else 0, data.get("end_time"), _encode(data), giveaway_id)
+        )
+
+    def load_documents(self, table):
+        """Load an id -> value collection (prizes, gifs, prize_lists)"""
+        if table not in DOCUMENT_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, data FROM {table} ORDER BY rowid").fetchall()
+        return {item_id: json.loads(data) for item_id, data in rows}
+
+    def save_documents(self, table, documents):
+        """Replace an id -> value collection"""
+        if table not in DOCUMENT_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(f"DELETE FROM {table}")
+                self._conn.executemany(
+                    f"INSERT INTO {table} (id, data) VALUES (?, ?)",
+                    ((item_id, _encode(value)) for item_id, value in documents.items())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load_document(self, table, item_id):
+        """Load a single value of an id -> value collection, None if it is missing"""
+        if table not in DOCUMENT_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        with self._lock:
+            row = self._conn.execute(f"SELECT data FROM {table} WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add_document(self, table, item_id, value):
+        """Insert a value unless one with the same id is already stored"""
+        if table not in DOCUMENT_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        with self._lock:
+            self._conn.execute(f"INSERT OR IGNORE INTO {table} (id, data) VALUES (?, ?)", (item_id, _encode(value)))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class SqliteGiveawayJournal:
+    """Journal that writes each giveaway change straight into SQLite
+
+    Drop-in replacement for GiveawayJournal: SQLite already makes every
+    change durable on its own, so there is nothing to replay or truncate.
+    The writes go to executor, which must be single-threaded so they are
+    applied in order and before any snapshot submitted after them.
+    """
+
+    def __init__(self, storage, executor):
+        self.storage = storage
+        self.executor = executor
+        self._last_write = None
+
+    def append(self, op, giveaway_id, **data):
+        self._submit(self.storage.apply_event, op, giveaway_id, _detach(data))
+
+    def append_many(self, op, giveaway_id, records):
+        self._submit(self.storage.apply_events, op, giveaway_id, [_detach(data) for data in records])
+
+    def _submit(self, func, *args):
+        self._last_write = self.executor.submit(func, *args)
+        self._last_write.add_done_callback(_log_write_error)
+
+    def replay(self, giveaways):
+        return 0
+
+    def has_entries(self):
+        return False
+
+    def rotate(self):
+        pass
+
+    def drop_rotated(self):
+        pass
+
+    def truncate(self):
+        pass
+
+    def close(self):
+        """Wait for the writes that are still queued"""
+        if self._last_write is not None:
+            concurrent.futures.wait([self._last_write])
+            self._last_write = None
+
+def _detach(data):
+    """Copy a change so the writer thread never reads dicts the event loop is still mutating"""
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in data.items()}
+
+def _log_write_error(future):
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Error writing giveaway change to SQLite: {error}")
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import logging
+import discord
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# fetch_user calls allowed in flight at once, and user names remembered between commands
+USER_FETCH_CONCURRENCY = int(os.getenv("USER_FETCH_CONCURRENCY", "5"))
+USER_NAME_CACHE_SIZE = int(os.getenv("USER_NAME_CACHE_SIZE", "10000"))
+
+# Remembered for users Discord does not know (deleted accounts), so they are not fetched again
+UNKNOWN_USER = ""
+
+class UserNameResolver:
+    """Turns user IDs into names as cheaply as possible
+
+    Each ID is looked up in the server's member cache, then the client's
+    user cache, then an LRU of names fetched earlier, and only the rest is
+    fetched over REST, at most max_concurrency requests at a time. Fetched
+    names go into the LRU.
+    """
+
+    def __init__(self, bot, max_concurrency=USER_FETCH_CONCURRENCY, cache_size=USER_NAME_CACHE_SIZE):
+        self.bot = bot
+        self._names = LRUCache(maxsize=cache_size)
+        self._fetch_slots = asyncio.Semaphore(max_concurrency)
+
+    def cached_name(self, guild, user_id):
+        """Name of a user if it is known without a request, otherwise None ("" for unknown users)"""
+        member = guild.get_member(user_id) if guild is not None else None
+        user = member or self.bot.get_user(user_id)
+        if user is not None:
+            return user.name
+        return self._names.get(user_id)
+
+    async def resolve(self, guild, user_ids):
+        """Names of user_ids as a dict; users Discord does not know map to UNKNOWN_USER"""
+        names = {}
+        missing = []
+        for user_id in user_ids:
+            user_id = int(user_id)
+            name = self.cached_name(guild, user_id)
+            if name is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = name
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch(user_id) for user_id in missing))
+            names.update(zip(missing, fetched))
+        return names
+
+    async def _fetch(self, user_id):
+        async with self._fetch_slots:
+            # Another page may have fetched it while this one waited
+            name = self._names.get(user_id)
+            if name is not None:
+                return name
+            try:
+                name = (await self.bot.fetch_user(user_id)).name
+            except discord.NotFound:
+                name = UNKNOWN_USER
+            except Exception as e:
+                logger.error(f"Error fetching user {user_id}: {e}")
+                # Not remembered, the next lookup tries again
+                return UNKNOWN_USER
+            self._names.put(user_id, name)
+            return name